@@ -1,21 +1,49 @@
-from fastapi import FastAPI, HTTPException, Depends, Body
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Float, Text, ForeignKey, TIMESTAMP, func
+from fastapi import FastAPI, HTTPException, Depends, Body, Query, Response, Request
+from sqlalchemy import create_engine, event, text, select, insert, delete, case, inspect, make_url, Index, Column, Integer, String, Boolean, Float, Text, ForeignKey, TIMESTAMP, func, exists, or_, and_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
-from typing import List, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError, IntegrityError, DataError
+from typing import List, Optional, Literal
+from collections import OrderedDict, Counter, defaultdict
 import os
-import requests
+import time
+import threading
+import asyncio
+import json
+import base64
+import re
+import math
+import hashlib
+import warnings
+import orjson
+import csv
+import io
+import contextvars
+import select as select_module
+import uuid
+import weakref
+import logging
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-from pydantic import BaseModel
-from fastapi.responses import HTMLResponse
-import plotly.express as px
-import pandas as pd
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pydantic import BaseModel, Field
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from starlette.datastructures import MutableHeaders
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger("api")
+
 # Create FastAPI app
 app = FastAPI()
 
@@ -26,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Lets browser clients read the pagination cursor
 )
 
 # Database configuration
@@ -34,15 +63,338 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 
-# Set search path in connection string
-SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}?options=-c%20search_path%3Dgroup44"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+DB_SCHEMA = "group44"
+
+def env_flag(name: str, default: bool = False):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Behind pgbouncer in transaction mode the app keeps no pool of its own, and
+# session settings are applied per transaction since server connections are shared
+DB_PGBOUNCER = env_flag("DB_PGBOUNCER")
+
+# DATABASE_URL overrides the DB_* settings entirely (e.g. a local stand-in database)
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+if DATABASE_URL:
+    SQLALCHEMY_DATABASE_URL = DATABASE_URL
+elif DB_PGBOUNCER:
+    # pgbouncer rejects the startup "options" parameter; search_path is set per transaction instead
+    SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+else:
+    # Set search path in connection string
+    SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}?options=-c%20search_path%3Dgroup44"
+
+class MeteredPoolMixin:
+    """Counts pool checkouts which had to wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self._metrics_lock = threading.Lock()
+
+    def _do_get(self):
+        exhausted = self.checkedout() >= self.size() + self._max_overflow
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            if exhausted:
+                with self._metrics_lock:
+                    self.waits += 1
+                    self.wait_seconds += time.perf_counter() - start
+
+    def _create_connection(self):
+        with self._metrics_lock:
+            self.connects += 1
+        return super()._create_connection()
+
+class MeteredQueuePool(MeteredPoolMixin, QueuePool):
+    pass
+
+class MeteredAsyncQueuePool(MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+if DB_PGBOUNCER:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool, pool_pre_ping=DB_POOL_PRE_PING)
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=MeteredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine, "connect")
+def set_connection_settings(dbapi_connection, connection_record):
+    if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER and engine.dialect.name == "postgresql":
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+        cursor.close()
+
+@event.listens_for(engine, "begin")
+def set_transaction_settings(conn):
+    if DB_PGBOUNCER and conn.dialect.name == "postgresql":
+        # On the DBAPI cursor, so the settings join the transaction the driver opens
+        # without re-entering begin. Engine-level, so every session and engine.begin() gets them.
+        cursor = conn.connection.dbapi_connection.cursor()
+        cursor.execute(f"SET LOCAL search_path TO {DB_SCHEMA}")
+        if DB_STATEMENT_TIMEOUT_MS:
+            cursor.execute(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+        cursor.close()
+
+# Async engine for the read endpoints. It is created on first use, so batch jobs
+# and the sync endpoints don't need the async drivers.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+async_engine = None
+AsyncSessionLocal = None
+
+def parse_pg_options(options: str):
+    # "-c search_path=group44 -c statement_timeout=5000" -> {"search_path": "group44", ...}
+    settings = {}
+    parts = options.split()
+    for flag, setting in zip(parts[::2], parts[1::2]):
+        if flag == "-c":
+            name, _, value = setting.partition("=")
+            settings[name] = value
+    return settings
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        url = make_url(SQLALCHEMY_DATABASE_URL)
+        backend = url.get_backend_name()
+        connect_args = {}
+        if backend == "postgresql":
+            # asyncpg takes server settings as a connect argument, not an "options" string
+            server_settings = parse_pg_options(url.query.get("options", ""))
+            if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER:
+                server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+            connect_args["server_settings"] = server_settings
+            if DB_PGBOUNCER:
+                # Prepared statements don't survive pgbouncer handing the server connection to another client
+                connect_args["statement_cache_size"] = 0
+        url = url.set(drivername=ASYNC_DRIVERS.get(backend, url.drivername)).difference_update_query(["options"])
+
+        if DB_PGBOUNCER:
+            async_engine = create_async_engine(url, poolclass=NullPool, connect_args=connect_args)
+        else:
+            async_engine = create_async_engine(
+                url,
+                poolclass=MeteredAsyncQueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING,
+                connect_args=connect_args,
+            )
+        event.listen(async_engine.sync_engine, "begin", set_transaction_settings)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+def pool_metrics(pool):
+    if not isinstance(pool, MeteredPoolMixin):
+        return {"class": type(pool).__name__}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "connects": pool.connects,
+        "waits": pool.waits,
+        "wait_seconds": round(pool.wait_seconds, 6),
+        "timeouts": pool.timeouts,
+    }
+
+# Instrumentation
+# Per-route latency plus SQL and outbound HTTP timings, served by /metrics in the
+# Prometheus text format. Statements and HTTP calls are attributed to the request
+# that made them through current_profile, set by RequestMetricsMiddleware.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Requests slower than this many milliseconds are logged with their statements; 0 turns the log off
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_MAX_STATEMENTS = 100
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+class Metric:
+    """A labelled counter, or a histogram when buckets are given."""
+
+    def __init__(self, name: str, help: str, labels=(), buckets=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                # Cumulative bucket counts, then sum and count
+                series = self.series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {'histogram' if self.buckets else 'counter'}"]
+        with self._lock:
+            series = sorted((key, list(value) if self.buckets else value) for key, value in self.series.items())
+        for label_values, value in series:
+            if not self.buckets:
+                lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+                continue
+            for bound, count in zip(self.buckets + ("+Inf",), value[:-2] + [value[-1]]):
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, label_values, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {value[-2]}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {value[-1]}")
+        return lines
+
+HTTP_REQUEST_SECONDS = Metric("http_request_duration_seconds", "Time to response start, by route.", ("method", "route"), LATENCY_BUCKETS)
+HTTP_REQUESTS = Metric("http_requests_total", "Requests by route and status.", ("method", "route", "status"))
+REQUEST_DB_STATEMENTS = Metric("http_request_db_statements", "SQL statements executed per request.", ("route",), COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Metric("http_request_db_duration_seconds", "Time spent in SQL per request.", ("route",), LATENCY_BUCKETS)
+DB_STATEMENT_SECONDS = Metric("db_statement_duration_seconds", "Duration of each SQL statement.", (), LATENCY_BUCKETS)
+OUTBOUND_HTTP_SECONDS = Metric("outbound_http_request_duration_seconds", "Outbound HTTP latency by host.", ("host",), LATENCY_BUCKETS)
+OUTBOUND_HTTP_ERRORS = Metric("outbound_http_errors_total", "Outbound HTTP requests that raised, by host.", ("host",))
+SWIPES_DROPPED = Metric("swipes_dropped_total", "Buffered swipes the database rejected, which were dropped.")
+METRICS = [
+    HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REQUEST_DB_STATEMENTS, REQUEST_DB_SECONDS,
+    DB_STATEMENT_SECONDS, OUTBOUND_HTTP_SECONDS, OUTBOUND_HTTP_ERRORS, SWIPES_DROPPED,
+]
+
+class RequestProfile:
+    """SQL and outbound HTTP work done while serving one request."""
+
+    def __init__(self, keep_statements: bool):
+        self.keep_statements = keep_statements
+        self.statement_count = 0
+        self.statement_seconds = 0.0
+        self.statements = []
+        self.http_calls = []
+        # Image lookups run their HTTP calls on several threads at once
+        self._lock = threading.Lock()
+
+    def add_statement(self, seconds: float, statement: str):
+        with self._lock:
+            self.statement_count += 1
+            self.statement_seconds += seconds
+            if self.keep_statements and len(self.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+                self.statements.append((seconds, statement))
+
+    def add_http_call(self, seconds: float, url: str):
+        with self._lock:
+            self.http_calls.append((seconds, url))
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+# Every engine, including the one behind the async engine, times its statements
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+    DB_STATEMENT_SECONDS.observe(elapsed)
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_statement(elapsed, statement)
+
+@event.listens_for(Engine, "handle_error")
+def discard_statement_timer(context):
+    if context.connection is not None and context.connection.info.get("statement_start"):
+        context.connection.info["statement_start"].pop()
+
+def record_outbound_http(url: str, seconds: float, failed: bool):
+    host = urlsplit(url).netloc
+    OUTBOUND_HTTP_SECONDS.observe(seconds, host)
+    if failed:
+        OUTBOUND_HTTP_ERRORS.inc(host)
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_http_call(seconds, url)
+
+def log_slow_request(method: str, path: str, status: int, seconds: float, profile: RequestProfile):
+    lines = [
+        f"Slow request: {method} {path} -> {status} in {seconds * 1000:.1f} ms, "
+        f"{profile.statement_count} statements in {profile.statement_seconds * 1000:.1f} ms"
+    ]
+    for elapsed, statement in profile.statements:
+        lines.append(f"  {elapsed * 1000:8.1f} ms  {' '.join(statement.split())}")
+    for elapsed, url in profile.http_calls:
+        lines.append(f"  {elapsed * 1000:8.1f} ms  GET {url}")
+    logger.warning("\n".join(lines))
+
+# Pool statistics from pool_metrics, as (metric name, type, help)
+POOL_METRIC_FIELDS = {
+    "size": ("db_pool_size", "gauge", "Configured pool size."),
+    "checked_out": ("db_pool_checked_out", "gauge", "Connections in use."),
+    "checked_in": ("db_pool_checked_in", "gauge", "Idle connections in the pool."),
+    "overflow": ("db_pool_overflow", "gauge", "Connections open beyond the pool size."),
+    "connects": ("db_pool_connects_total", "counter", "Connections opened."),
+    "waits": ("db_pool_waits_total", "counter", "Checkouts that had to wait for a connection."),
+    "wait_seconds": ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+    "timeouts": ("db_pool_timeouts_total", "counter", "Checkouts that timed out."),
+}
+
+def render_pool_metrics(pools: dict):
+    stats = {label: pool_metrics(pool) for label, pool in pools.items() if pool is not None}
+    lines = []
+    for field, (name, kind, help) in POOL_METRIC_FIELDS.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for label, values in stats.items():
+            # Unmetered pools (NullPool behind pgbouncer) only report their class
+            if field in values:
+                lines.append(f"{name}{format_labels(('pool',), (label,))} {values[field]}")
+    return lines
+
 Base = declarative_base()
 
 # Models
 class University(Base):
     __tablename__ = "universities"
+    __table_args__ = (
+        # Listing filters that are paged in id order
+        Index("ix_universities_state_id", "state", "id"),
+        Index("ix_universities_sector_id", "sector", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(Text)
@@ -58,12 +410,12 @@ class University(Base):
     pct_submit_act = Column(Float)
     sat_reading_25 = Column(Float)
     sat_reading_75 = Column(Float)
-    sat_math_25 = Column(Float)
-    sat_math_75 = Column(Float)
+    sat_math_25 = Column(Float, index=True)
+    sat_math_75 = Column(Float, index=True)
     sat_writing_25 = Column(Float)
     sat_writing_75 = Column(Float)
-    act_composite_25 = Column(Float)
-    act_composite_75 = Column(Float)
+    act_composite_25 = Column(Float, index=True)
+    act_composite_75 = Column(Float, index=True)
     description = Column(Text)
     website = Column(Text)
     phone_number = Column(Text)
@@ -73,19 +425,31 @@ class University(Base):
 
 class InstitutionIdentity(Base):
     __tablename__ = "institution_identity"
+    __table_args__ = (
+        # HBCUs and tribal colleges are a small share of the catalog, so only they are indexed
+        Index("ix_institution_identity_hbcu", "university_id",
+              postgresql_where=text("is_hbcu"), sqlite_where=text("is_hbcu")),
+        Index("ix_institution_identity_tribal", "university_id",
+              postgresql_where=text("is_tribal"), sqlite_where=text("is_tribal")),
+    )
 
     id = Column(Integer, primary_key=True)
-    university_id = Column(Integer, ForeignKey('universities.id'))
+    university_id = Column(Integer, ForeignKey('universities.id'), index=True)
     is_hbcu = Column(Boolean)
     is_tribal = Column(Boolean)
-    religious_affiliation = Column(Text)
+    religious_affiliation = Column(Text, index=True)
     carnegie_classification = Column(Text)
-    control_of_institution = Column(Text)
+    control_of_institution = Column(Text, index=True)
 
     university = relationship("University", back_populates="institution_identity")
 
 class DegreeOffering(Base):
     __tablename__ = "degree_offerings"
+    __table_args__ = (
+        # Covers the EXISTS subquery behind the degree filters
+        Index("ix_degree_offerings_university_degrees",
+              "university_id", "offers_bachelors", "offers_masters", "offers_doctorate"),
+    )
 
     id = Column(Integer, primary_key=True)
     university_id = Column(Integer, ForeignKey('universities.id'))
@@ -104,25 +468,78 @@ class UserSwipe(Base):
     __tablename__ = "user_swipes"
 
     id = Column(Integer, primary_key=True)
-    university_id = Column(Integer, ForeignKey("universities.id"))
+    university_id = Column(Integer, ForeignKey("universities.id"), index=True)
     swipe_direction = Column(String(10))
     swipe_timestamp = Column(TIMESTAMP, default=datetime.utcnow)
     notes = Column(Text)
 
 class UniversityMatch(Base):
     __tablename__ = "university_matches"
+    __table_args__ = (
+        # Keyset order of GET /matches
+        Index("ix_university_matches_timestamp_id", "match_timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
-    university_id = Column(Integer, ForeignKey("universities.id"))
+    university_id = Column(Integer, ForeignKey("universities.id"), index=True)
     match_timestamp = Column(TIMESTAMP, default=datetime.utcnow)
 
+class UniversitySwipeStats(Base):
+    """Swipe and match counts per university, kept up to date as swipes are written."""
+    __tablename__ = "university_swipe_stats"
+
+    university_id = Column(Integer, ForeignKey("universities.id"), primary_key=True)
+    left_swipes = Column(Integer, nullable=False, default=0, index=True)
+    right_swipes = Column(Integer, nullable=False, default=0, index=True)
+    matches = Column(Integer, nullable=False, default=0, index=True)
+
+class SwipeStatsRollup(Base):
+    """The same counts summed per (state, sector); a missing state or sector is stored as ""."""
+    __tablename__ = "swipe_stats_rollups"
+
+    state = Column(Text, primary_key=True)
+    sector = Column(Text, primary_key=True)
+    left_swipes = Column(Integer, nullable=False, default=0)
+    right_swipes = Column(Integer, nullable=False, default=0)
+    matches = Column(Integer, nullable=False, default=0)
+
+class CacheInvalidation(Base):
+    """Cache events for other workers, when they can't be sent with NOTIFY (see CacheSync)."""
+    __tablename__ = "cache_invalidations"
+
+    id = Column(Integer, primary_key=True)
+    origin = Column(Text)
+    payload = Column(Text)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow, index=True)
+
+class UniversityImage(Base):
+    __tablename__ = "university_images"
+
+    university_id = Column(Integer, ForeignKey("universities.id"), primary_key=True)
+    image_url = Column(Text)
+    alt_text = Column(Text)
+    attribution = Column(Text)
+    fetched_at = Column(TIMESTAMP, default=datetime.utcnow)
+
 class SwipeRequest(BaseModel):
-    university_id: int
-    swipe_direction: str
+    # Checked on arrival, since buffered swipes are only written later
+    university_id: int = Field(..., ge=1, le=2**31 - 1)
+    swipe_direction: Literal["left", "right"]
     notes: Optional[str] = None
 
-# Create tables (if they don't exist)
-Base.metadata.create_all(bind=engine)
+# Create tables (if they don't exist). Run once before serving, not at import,
+# so workers can start without touching the database.
+def create_schema():
+    # The swipe counters start from the existing history when their table is first created
+    backfill_swipe_stats = not inspect(engine).has_table(UniversitySwipeStats.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add any of their indexes that are missing
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    if backfill_swipe_stats:
+        with SessionLocal() as db:
+            rebuild_swipe_stats(db)
 
 # Dependency
 def get_db():
@@ -132,119 +549,968 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+# Columns returned on university cards (search, by-state) and in the full listing.
+# Projecting columns instead of loading ORM objects keeps each endpoint to a single
+# SELECT; reading u.institution_identity on an ORM row lazy-loads it one row at a time.
+UNIVERSITY_SUMMARY_COLUMNS = [
+    University.id,
+    University.name,
+    University.state,
+    University.sector,
+    University.zip,
+    University.latitude,
+    University.longitude,
+    InstitutionIdentity.is_hbcu,
+    InstitutionIdentity.is_tribal,
+    InstitutionIdentity.religious_affiliation,
+    InstitutionIdentity.carnegie_classification,
+    InstitutionIdentity.control_of_institution,
+]
+
+UNIVERSITY_COLUMNS = UNIVERSITY_SUMMARY_COLUMNS + [
+    University.applicants_total,
+    University.admissions_total,
+    University.enrolled_total,
+    University.pct_submit_sat,
+    University.pct_submit_act,
+    University.sat_reading_25,
+    University.sat_reading_75,
+    University.sat_math_25,
+    University.sat_math_75,
+    University.sat_writing_25,
+    University.sat_writing_75,
+    University.act_composite_25,
+    University.act_composite_75,
+    University.description,
+    University.website,
+    University.phone_number,
+]
+
+def university_select(columns=UNIVERSITY_COLUMNS):
+    return select(*columns).join(InstitutionIdentity, InstitutionIdentity.university_id == University.id)
+
+def university_row_to_dict(row):
+    return dict(row._mapping)
+
+def json_response(content: bytes, headers: dict = None):
+    """Sends already-encoded JSON, skipping FastAPI's validation and encoding."""
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def encode_university_rows(rows: List[dict], kind: str):
+    """
+    Encodes a list of card or listing rows with orjson. Each university's encoded
+    fragment is kept (per kind, since cards and listing rows differ), so a list is
+    mostly assembled by concatenation. The fragments live in the catalog cache and
+    are dropped with it.
+    """
+    # Not counted as a cache hit or miss, since every encoded list looks it up
+    fragments = catalog_cache.setdefault(("fragments",), {})
+    parts = []
+    for row in rows:
+        key = (kind, row["id"])
+        fragment = fragments.get(key)
+        if fragment is None:
+            fragment = fragments[key] = orjson.dumps(row)
+        parts.append(fragment)
+    return b"[" + b",".join(parts) + b"]"
+
+class CatalogCache:
+    """Read-through LRU cache for catalog data, with a TTL on every entry.
+
+    Keys are tuples whose first item names the kind of entry, e.g.
+    ("university", 42) for one card or ("universities", ...) for a listing page.
+    Loads are single-flight: concurrent misses on a key wait for the one loader
+    already running instead of each running their own.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Loads in flight, by key: concurrent futures for threads, asyncio futures for coroutines
+        self._loading = {}
+        self._aloading = {}
+        # Bumped by invalidate(), so a load that started before it isn't stored
+        self._generation = 0
+
+    def get_or_load(self, key, loader):
+        while True:
+            found, value, future, generation = self._claim(key, self._loading, Future)
+            if found:
+                return value
+            if generation is None:
+                # Another thread is loading this key; its result (or error) is ours too
+                try:
+                    return future.result()
+                except CancelledError:
+                    continue
+            try:
+                value = loader()
+            except BaseException as e:
+                self._finish(key, self._loading, future)
+                future.set_exception(e)
+                raise
+            self._store(key, value, generation)
+            self._finish(key, self._loading, future)
+            future.set_result(value)
+            return value
+
+    async def aget_or_load(self, key, loader):
+        """Same as get_or_load, for a loader that is a coroutine function."""
+        loop = asyncio.get_running_loop()
+        while True:
+            found, value, future, generation = self._claim(key, self._aloading, loop.create_future)
+            if found:
+                return value
+            if generation is None:
+                try:
+                    # Shielded, so a waiter that is cancelled doesn't cancel the shared load
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        # The request running the load was cancelled; load again
+                        continue
+                    raise
+            try:
+                value = await loader()
+            except asyncio.CancelledError:
+                self._finish(key, self._aloading, future)
+                future.cancel()
+                raise
+            except BaseException as e:
+                self._finish(key, self._aloading, future)
+                future.set_exception(e)
+                # Waiters re-raise it themselves; without any, asyncio would log it as never retrieved
+                future.exception()
+                raise
+            self._store(key, value, generation)
+            self._finish(key, self._aloading, future)
+            future.set_result(value)
+            return value
+
+    def setdefault(self, key, value):
+        """The live entry for key, storing value first if there is none, without counting a hit/miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._put(key, value)
+        return value
+
+    def peek(self, key):
+        """The live entry for key, or None, without loading or counting a hit/miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        return None
+
+    def _claim(self, key, loading: dict, new_future):
+        """
+        Under the lock: (True, value, None, None) for a live entry; (False, None, future, None)
+        when another caller is loading key; otherwise (False, None, future, generation) and the
+        caller must run the loader and complete future.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1], None, None
+            future = loading.get(key)
+            if future is not None:
+                self.hits += 1
+                return False, None, future, None
+            self.misses += 1
+            future = loading[key] = new_future()
+            return False, None, future, self._generation
+
+    def _finish(self, key, loading: dict, future):
+        with self._lock:
+            if loading.get(key) is future:
+                del loading[key]
+
+    def _store(self, key, value, generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # Invalidated while loading; the value may predate the change
+                return
+            self._put(key, value)
+
+    def _put(self, key, value):
+        # Called with the lock held
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """Drop every entry, or only those whose key matches predicate. Returns the count dropped."""
+        with self._lock:
+            # Loads already running finish for their callers, but are neither stored nor joined
+            self._generation += 1
+            for loading in (self._loading, self._aloading):
+                for key in [key for key in loading if predicate is None or predicate(key)]:
+                    del loading[key]
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if predicate(key)]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+# Entry kinds keyed by a single university id; everything else is a query result
+CATALOG_ENTITY_KINDS = {"university", "degrees"}
+
+catalog_cache = CatalogCache(
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "3600")),
+)
+
+# Opaque keyset cursors: the sort key of the last row on a page, as url-safe base64 JSON
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def cursor_id(value):
+    # Ids are 64-bit in the database; JSON booleans and floats are not ids
+    if type(value) is not int or not -2**63 <= value < 2**63:
+        raise ValueError(f"not an id: {value!r}")
+    return value
+
+def cursor_timestamp(value):
+    if not isinstance(value, str):
+        raise ValueError(f"not a timestamp: {value!r}")
+    return datetime.fromisoformat(value)
+
+def decode_cursor(cursor: str, *parsers):
+    """The cursor's values, each passed through its parser; a malformed cursor is a 400."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("wrong number of values")
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class UniversityFilters:
+    """Catalog filters shared by the endpoints that list universities."""
+
+    def __init__(
+        self,
+        states: str = None,
+        sector: str = None,
+        offers_bachelors: bool = None,
+        offers_masters: bool = None,
+        offers_doctorate: bool = None,
+        is_hbcu: bool = None,
+        is_tribal: bool = None,
+        religious_affiliation: str = None,
+        control_of_institution: str = None,
+        min_sat_math: float = None,
+        max_sat_math: float = None,
+        min_act_composite: float = None,
+        max_act_composite: float = None,
+    ):
+        self.states = [state.strip() for state in states.split(',')] if states else None
+        self.sector = sector
+        self.offers_bachelors = offers_bachelors
+        self.offers_masters = offers_masters
+        self.offers_doctorate = offers_doctorate
+        self.is_hbcu = is_hbcu
+        self.is_tribal = is_tribal
+        self.religious_affiliation = religious_affiliation
+        self.control_of_institution = control_of_institution
+        self.min_sat_math = min_sat_math
+        self.max_sat_math = max_sat_math
+        self.min_act_composite = min_act_composite
+        self.max_act_composite = max_act_composite
+
+    def apply(self, query):
+        # Apply state filters if provided
+        if self.states:
+            query = query.filter(University.state.in_(self.states))
+
+        # Apply sector filter if provided
+        if self.sector:
+            query = query.filter(University.sector == self.sector)
+
+        # Degree filters use EXISTS so a university with several offering rows
+        # still appears once
+        degree_filters = []
+        if self.offers_bachelors is not None:
+            degree_filters.append(DegreeOffering.offers_bachelors == self.offers_bachelors)
+        if self.offers_masters is not None:
+            degree_filters.append(DegreeOffering.offers_masters == self.offers_masters)
+        if self.offers_doctorate is not None:
+            degree_filters.append(DegreeOffering.offers_doctorate == self.offers_doctorate)
+        if degree_filters:
+            query = query.filter(
+                exists().where(DegreeOffering.university_id == University.id, *degree_filters)
+            )
+
+        # Apply institution identity filters
+        if self.is_hbcu is not None:
+            query = query.filter(InstitutionIdentity.is_hbcu == self.is_hbcu)
+        if self.is_tribal is not None:
+            query = query.filter(InstitutionIdentity.is_tribal == self.is_tribal)
+        if self.religious_affiliation:
+            query = query.filter(InstitutionIdentity.religious_affiliation == self.religious_affiliation)
+        if self.control_of_institution:
+            query = query.filter(InstitutionIdentity.control_of_institution == self.control_of_institution)
+
+        # Apply test score filters
+        if self.min_sat_math is not None:
+            query = query.filter(University.sat_math_25 >= self.min_sat_math)
+        if self.max_sat_math is not None:
+            query = query.filter(University.sat_math_75 <= self.max_sat_math)
+        if self.min_act_composite is not None:
+            query = query.filter(University.act_composite_25 >= self.min_act_composite)
+        if self.max_act_composite is not None:
+            query = query.filter(University.act_composite_75 <= self.max_act_composite)
+
+        return query
+
+    def cache_key(self):
+        return tuple((name, tuple(value) if isinstance(value, list) else value) for name, value in vars(self).items())
+
+    def is_active(self):
+        return any(value is not None for value in vars(self).values())
+
+async def load_filtered_ids(db: AsyncSession, filters: UniversityFilters):
+    import numpy as np
+
+    if CATALOG_FILTER_ENGINE == "memory":
+        catalog = await catalog_cache.aget_or_load(("columnar_catalog",), lambda: load_columnar_catalog(db))
+        return np.unique(catalog.ids[catalog.mask(filters)])
+
+    result = await db.execute(filters.apply(university_select([University.id])))
+    return np.array(result.scalars().all(), dtype=np.int64)
+
+# "sql" builds a query per request; "memory" filters a columnar copy of the catalog
+CATALOG_FILTER_ENGINE = os.getenv("CATALOG_FILTER_ENGINE", "sql")
+
+class ColumnarCatalog:
+    """
+    The universities joined to institution_identity, held as NumPy columns in id
+    order, with UniversityFilters evaluated as vectorized boolean masks.
+
+    Results match the SQL path: NULLs never satisfy a comparison (NaN and None
+    compare false), and the degree filters match when any one degree_offerings
+    row satisfies all of them, like the EXISTS subquery.
+    """
+
+    TEXT_FIELDS = ["state", "sector", "religious_affiliation", "control_of_institution"]
+    NUMBER_FIELDS = ["is_hbcu", "is_tribal", "sat_math_25", "sat_math_75", "act_composite_25", "act_composite_75"]
+    DEGREE_FIELDS = ["offers_bachelors", "offers_masters", "offers_doctorate"]
+
+    def __init__(self, rows: List[dict], degrees: List[tuple]):
+        import numpy as np
+
+        self.rows = rows
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.text = {field: np.array([row[field] for row in rows], dtype=object) for field in self.TEXT_FIELDS}
+        # Booleans become 1.0/0.0 with NaN for NULL, so NULL never equals either
+        self.numbers = {field: np.array([row[field] for row in rows], dtype=float) for field in self.NUMBER_FIELDS}
+        self.degree_university_ids = np.array([degree[0] for degree in degrees], dtype=np.int64)
+        self.degrees = {
+            field: np.array([degree[position + 1] for degree in degrees], dtype=float)
+            for position, field in enumerate(self.DEGREE_FIELDS)
+        }
+
+    def mask(self, filters: UniversityFilters):
+        import numpy as np
+
+        mask = np.ones(len(self.rows), dtype=bool)
+        if filters.states:
+            mask &= np.isin(self.text["state"], filters.states)
+        for field in ("sector", "religious_affiliation", "control_of_institution"):
+            if getattr(filters, field):
+                mask &= self.text[field] == getattr(filters, field)
+
+        degree_mask = np.ones(len(self.degree_university_ids), dtype=bool)
+        degree_filtered = False
+        for field in self.DEGREE_FIELDS:
+            if getattr(filters, field) is not None:
+                degree_mask &= self.degrees[field] == float(getattr(filters, field))
+                degree_filtered = True
+        if degree_filtered:
+            mask &= np.isin(self.ids, self.degree_university_ids[degree_mask])
+
+        for field in ("is_hbcu", "is_tribal"):
+            if getattr(filters, field) is not None:
+                mask &= self.numbers[field] == float(getattr(filters, field))
+        if filters.min_sat_math is not None:
+            mask &= self.numbers["sat_math_25"] >= filters.min_sat_math
+        if filters.max_sat_math is not None:
+            mask &= self.numbers["sat_math_75"] <= filters.max_sat_math
+        if filters.min_act_composite is not None:
+            mask &= self.numbers["act_composite_25"] >= filters.min_act_composite
+        if filters.max_act_composite is not None:
+            mask &= self.numbers["act_composite_75"] <= filters.max_act_composite
+        return mask
+
+    def page(self, filters: UniversityFilters, skip: int, limit: int, cursor: str = None):
+        """Same page and next cursor as the SQL listing query."""
+        import numpy as np
+
+        mask = self.mask(filters)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, cursor_id)
+            mask &= self.ids > last_id
+            positions = np.flatnonzero(mask)[:limit + 1]
+        else:
+            positions = np.flatnonzero(mask)[skip:skip + limit + 1]
+
+        next_cursor = None
+        if len(positions) > limit:
+            positions = positions[:limit]
+            next_cursor = encode_cursor(int(self.ids[positions[-1]]))
+        return [self.rows[position] for position in positions], next_cursor
+
+async def load_columnar_catalog(db: AsyncSession):
+    result = await db.execute(university_select().order_by(University.id))
+    rows = [university_row_to_dict(row) for row in result]
+    degrees = (await db.execute(select(
+        DegreeOffering.university_id,
+        DegreeOffering.offers_bachelors,
+        DegreeOffering.offers_masters,
+        DegreeOffering.offers_doctorate,
+    ))).all()
+    return await run_in_threadpool(ColumnarCatalog, rows, degrees)
+
+# Geospatial index
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GEO_CELL_DEGREES = float(os.getenv("GEO_CELL_DEGREES", "1.0"))
+# First radius tried for a nearest-N query; it doubles until enough universities are found
+GEO_NEAREST_START_KM = 50.0
+# Largest limit a nearest query may ask for
+NEAR_MAX_LIMIT = 200
+
+class GeoIndex:
+    """
+    Grid of GEO_CELL_DEGREES cells over university coordinates.
+
+    A radius query only computes haversine distances for the universities in the
+    cells overlapping the search circle's bounding box.
+    """
+
+    def __init__(self, rows: List[dict], cell_degrees: float = GEO_CELL_DEGREES):
+        import numpy as np
+
+        self.rows = [row for row in rows if row["latitude"] is not None and row["longitude"] is not None]
+        self.cell_degrees = cell_degrees
+        self.lat_cells = math.ceil(180 / cell_degrees)
+        self.lon_cells = math.ceil(360 / cell_degrees)
+        self.ids = np.array([row["id"] for row in self.rows], dtype=np.int64)
+        self.lat = np.radians([row["latitude"] for row in self.rows])
+        self.lon = np.radians([row["longitude"] for row in self.rows])
+
+        cells = defaultdict(list)
+        for position, row in enumerate(self.rows):
+            cells[self._cell(row["latitude"], row["longitude"])].append(position)
+        self.cells = {cell: np.array(positions) for cell, positions in cells.items()}
+
+    def _cell(self, lat: float, lon: float):
+        lat_cell = min(int((lat + 90) // self.cell_degrees), self.lat_cells - 1)
+        lon_cell = int((lon + 180) // self.cell_degrees) % self.lon_cells
+        return lat_cell, lon_cell
+
+    def _candidates(self, lat: float, lon: float, radius_km: float):
+        import numpy as np
+
+        dlat = radius_km / KM_PER_DEGREE
+        lat_low = self._cell(max(lat - dlat, -90), 0)[0]
+        lat_high = self._cell(min(lat + dlat, 90), 0)[0]
+
+        # The box widens toward the poles; past them, or across half the globe, take every column
+        edge_lat = min(abs(lat) + dlat, 90)
+        dlon = dlat / math.cos(math.radians(edge_lat)) if edge_lat < 90 else 360
+        if dlon >= 180:
+            lon_range = range(self.lon_cells)
+        else:
+            first = int((lon - dlon + 180) // self.cell_degrees)
+            last = int((lon + dlon + 180) // self.cell_degrees)
+            lon_range = [cell % self.lon_cells for cell in range(first, last + 1)]
+
+        positions = [
+            self.cells[(lat_cell, lon_cell)]
+            for lat_cell in range(lat_low, lat_high + 1)
+            for lon_cell in lon_range
+            if (lat_cell, lon_cell) in self.cells
+        ]
+        return np.concatenate(positions) if positions else np.array([], dtype=np.int64)
+
+    def within(self, lat: float, lon: float, radius_km: float, allowed=None):
+        """Positions within radius_km of (lat, lon), nearest first, with their distances."""
+        import numpy as np
+
+        positions = self._candidates(lat, lon, radius_km)
+        if allowed is not None:
+            positions = positions[np.isin(self.ids[positions], allowed)]
+
+        # Haversine distance for the candidates only
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        a = (
+            np.sin((self.lat[positions] - lat1) / 2) ** 2
+            + math.cos(lat1) * np.cos(self.lat[positions]) * np.sin((self.lon[positions] - lon1) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.lexsort((self.ids[positions], distances))
+        return positions[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, limit: int, radius_km: float = None, allowed=None):
+        if radius_km is None:
+            # Everything within the radius is checked, so once `limit` are found they are the nearest
+            radius_km = GEO_NEAREST_START_KM
+            while True:
+                positions, distances = self.within(lat, lon, radius_km, allowed)
+                if len(positions) >= limit or radius_km >= math.pi * EARTH_RADIUS_KM:
+                    break
+                radius_km *= 2
+        else:
+            positions, distances = self.within(lat, lon, radius_km, allowed)
+
+        return [
+            {**self.rows[position], "distance_km": round(float(distance), 3)}
+            for position, distance in zip(positions[:limit], distances[:limit])
+        ]
+
+async def load_geo_index(db: AsyncSession):
+    result = await db.execute(university_select().order_by(University.id))
+    rows = [university_row_to_dict(row) for row in result]
+    return await run_in_threadpool(GeoIndex, rows)
+
+# Names sharing fewer than this share of the query's trigrams are only returned if they contain the query
+SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.6"))
+# Largest limit a search may ask for
+SEARCH_MAX_LIMIT = 200
+
+def normalize_name(name: str):
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", name.lower()).split())
+
+def name_trigrams(name: str):
+    # Same padding as pg_trgm: two spaces before each word, one after
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class NameSearchIndex:
+    """
+    In-memory trigram index over university names.
+
+    Results are ranked by match tier (name prefix, word prefix, substring, fuzzy),
+    then by the share of query trigrams found in the name (like pg_trgm's
+    word_similarity()), then by whole-name similarity (like similarity()).
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.names = [normalize_name(row["name"] or "") for row in rows]
+        self.gram_counts = []
+        self.postings = defaultdict(list)
+        for position, name in enumerate(self.names):
+            grams = name_trigrams(name)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def search(self, query: str, limit: int, prefix_only: bool = False):
+        query = normalize_name(query)
+        query_grams = name_trigrams(query)
+        if not query_grams:
+            return []
+
+        # Count the trigrams each candidate shares with the query
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        ranked = []
+        for position, count in shared.items():
+            name = self.names[position]
+            coverage = count / len(query_grams)
+            similarity = count / (len(query_grams) + self.gram_counts[position] - count)
+            if name.startswith(query):
+                tier = 3
+            elif f" {query}" in f" {name}":
+                tier = 2
+            elif query in name:
+                tier = 1
+            else:
+                tier = 0
+            if prefix_only and tier < 2:
+                continue
+            if tier == 0 and coverage < SEARCH_SIMILARITY_THRESHOLD:
+                continue
+            ranked.append((-tier, -coverage, -similarity, position))
+
+        ranked.sort()
+        return [self.rows[position] for *_, position in ranked[:limit]]
+
+async def load_name_search_index(db: AsyncSession):
+    result = await db.execute(university_select(UNIVERSITY_SUMMARY_COLUMNS).order_by(University.id))
+    rows = [university_row_to_dict(row) for row in result]
+    # Building the index over the whole catalog is CPU-bound, so keep it off the event loop
+    return await run_in_threadpool(NameSearchIndex, rows)
+
+# HTTP caching
+# Read endpoints declare a Cache-Control policy with @cache_policy. For those routes the
+# ConditionalGetMiddleware adds an ETag (a hash of the body) and answers a matching
+# If-None-Match, or an If-Modified-Since against Last-Modified, with an empty 304.
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=300")
+IMAGE_CACHE_CONTROL = os.getenv("IMAGE_CACHE_CONTROL", "public, max-age=86400")
+
+def cache_policy(cache_control: str):
+    def decorate(endpoint):
+        endpoint.cache_control = cache_control
+        return endpoint
+    return decorate
+
+def http_date(value: datetime):
+    # Timestamps are stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def etag_matches(request: Request, etag: str):
+    """True when If-None-Match lists etag or "*"; weak tags compare equal to strong ones."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def not_modified(request: Request, etag: str, last_modified: str = None):
+    # If-None-Match takes precedence; If-Modified-Since only counts when it is absent
+    if "if-none-match" in request.headers:
+        return etag_matches(request, etag)
+    since = request.headers.get("if-modified-since")
+    if not since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+
+# Both middlewares are plain ASGI: @app.middleware("http") would add a task group
+# and a memory stream to every request, streamed exports included.
+class ConditionalGetMiddleware:
+    """Adds the ETag and Cache-Control to @cache_policy routes, and answers a match with a 304."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+
+        async def send_buffered(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Routing has run by now, so the matched endpoint is in the scope
+                cache_control = getattr(scope.get("endpoint"), "cache_control", None)
+                if cache_control is not None and message["status"] == 200:
+                    # Only these responses are held back, to hash the whole body
+                    start = (message, cache_control)
+                    return
+            elif message["type"] == "http.response.body" and start is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self.send_conditional(scope, send, *start, b"".join(chunks))
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_buffered)
+
+    async def send_conditional(self, scope, send, start: dict, cache_control: str, body: bytes):
+        headers = MutableHeaders(raw=list(start["headers"]))
+        etag = headers.get("etag") or '"' + hashlib.sha1(body).hexdigest() + '"'
+        headers["etag"] = etag
+        # An endpoint can still override the route's policy for one response
+        if "cache-control" not in headers:
+            headers["cache-control"] = cache_control
+        if not_modified(Request(scope), etag, headers.get("last-modified")):
+            del headers["content-length"]
+            del headers["content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+class RequestMetricsMiddleware:
+    """Times every request and attributes its SQL and outbound HTTP calls to its route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(keep_statements=SLOW_REQUEST_MS > 0)
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        status = 500
+        first_byte = None
+
+        async def send_timed(message):
+            nonlocal status, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                first_byte = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_profile.reset(token)
+            # The route template keeps label cardinality bounded; unmatched paths share one label
+            route = scope.get("route")
+            route = route.path if route is not None else "<unmatched>"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(first_byte if first_byte is not None else elapsed, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            # Statements run while a streamed body is sent count too
+            REQUEST_DB_STATEMENTS.observe(profile.statement_count, route)
+            REQUEST_DB_SECONDS.observe(profile.statement_seconds, route)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                log_slow_request(method, scope["path"], status, elapsed, profile)
+
+# Added last, so it wraps ConditionalGetMiddleware and times the whole request
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
 # API Endpoints
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Universities API"}
 
 @app.get("/universities/states")
-async def get_all_states(db: Session = Depends(get_db)):
-    states = db.query(University.state).distinct().order_by(University.state).all()
-    return [state[0] for state in states if state[0] is not None]
+@cache_policy(CATALOG_CACHE_CONTROL)
+async def get_all_states(db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        states = await db.execute(select(University.state).distinct().order_by(University.state))
+        return [state[0] for state in states if state[0] is not None]
+    return await catalog_cache.aget_or_load(("states",), load)
+
+# Largest page the listing and /matches return
+LISTING_MAX_LIMIT = 1000
 
 @app.get("/universities/", response_model=List[dict])
-def get_universities(
-    skip: int = 0, 
-    limit: int = 100,
-    states: str = None,
-    sector: str = None,
-    offers_bachelors: bool = None,
-    offers_masters: bool = None,
-    offers_doctorate: bool = None,
-    is_hbcu: bool = None,
-    is_tribal: bool = None,
-    religious_affiliation: str = None,
-    control_of_institution: str = None,
-    min_sat_math: float = None,
-    max_sat_math: float = None,
-    min_act_composite: float = None,
-    max_act_composite: float = None,
-    db: Session = Depends(get_db)
+@cache_policy(CATALOG_CACHE_CONTROL)
+async def get_universities(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=LISTING_MAX_LIMIT),
+    cursor: str = None,
+    filters: UniversityFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(University).join(University.institution_identity)
-    
-    # Apply state filters if provided
-    if states:
-        state_list = [state.strip() for state in states.split(',')]
-        query = query.filter(University.state.in_(state_list))
-    
-    # Apply sector filter if provided
-    if sector:
-        query = query.filter(University.sector == sector)
-    
-    # Apply degree filters if provided
-    if any([offers_bachelors, offers_masters, offers_doctorate]):
-        query = query.join(DegreeOffering)
-        if offers_bachelors is not None:
-            query = query.filter(DegreeOffering.offers_bachelors == offers_bachelors)
-        if offers_masters is not None:
-            query = query.filter(DegreeOffering.offers_masters == offers_masters)
-        if offers_doctorate is not None:
-            query = query.filter(DegreeOffering.offers_doctorate == offers_doctorate)
-    
-    # Apply institution identity filters
-    if is_hbcu is not None:
-        query = query.filter(InstitutionIdentity.is_hbcu == is_hbcu)
-    if is_tribal is not None:
-        query = query.filter(InstitutionIdentity.is_tribal == is_tribal)
-    if religious_affiliation:
-        query = query.filter(InstitutionIdentity.religious_affiliation == religious_affiliation)
-    if control_of_institution:
-        query = query.filter(InstitutionIdentity.control_of_institution == control_of_institution)
-    
-    # Apply test score filters
-    if min_sat_math is not None:
-        query = query.filter(University.sat_math_25 >= min_sat_math)
-    if max_sat_math is not None:
-        query = query.filter(University.sat_math_75 <= max_sat_math)
-    if min_act_composite is not None:
-        query = query.filter(University.act_composite_25 >= min_act_composite)
-    if max_act_composite is not None:
-        query = query.filter(University.act_composite_75 <= max_act_composite)
-    
-    universities = query.offset(skip).limit(limit).all()
-    
-    return [{
-        "id": u.id,
-        "name": u.name,
-        "state": u.state,
-        "sector": u.sector,
-        "zip": u.zip,
-        "latitude": u.latitude,
-        "longitude": u.longitude,
-        "is_hbcu": u.institution_identity.is_hbcu if u.institution_identity else False,
-        "is_tribal": u.institution_identity.is_tribal if u.institution_identity else False,
-        "religious_affiliation": u.institution_identity.religious_affiliation if u.institution_identity else None,
-        "carnegie_classification": u.institution_identity.carnegie_classification if u.institution_identity else '',
-        "control_of_institution": u.institution_identity.control_of_institution if u.institution_identity else '',
-        # New fields
-        "applicants_total": u.applicants_total,
-        "admissions_total": u.admissions_total,
-        "enrolled_total": u.enrolled_total,
-        "pct_submit_sat": u.pct_submit_sat,
-        "pct_submit_act": u.pct_submit_act,
-        "sat_reading_25": u.sat_reading_25,
-        "sat_reading_75": u.sat_reading_75,
-        "sat_math_25": u.sat_math_25,
-        "sat_math_75": u.sat_math_75,
-        "sat_writing_25": u.sat_writing_25,
-        "sat_writing_75": u.sat_writing_75,
-        "act_composite_25": u.act_composite_25,
-        "act_composite_75": u.act_composite_75,
-        "description": u.description,
-        "website": u.website,
-        "phone_number": u.phone_number
-    } for u in universities]
+    async def load():
+        if CATALOG_FILTER_ENGINE == "memory":
+            catalog = await catalog_cache.aget_or_load(("columnar_catalog",), lambda: load_columnar_catalog(db))
+            universities, next_cursor = catalog.page(filters, skip, limit, cursor)
+            return encode_university_rows(universities, "listing"), next_cursor
+
+        # One statement: identity columns come from the join, degree filters are EXISTS subqueries
+        query = filters.apply(university_select()).order_by(University.id)
+
+        # A cursor seeks past the last id seen, so deep pages cost the same as the first
+        if cursor:
+            (last_id,) = decode_cursor(cursor, cursor_id)
+            query = query.filter(University.id > last_id)
+        else:
+            query = query.offset(skip)
+
+        # Fetch one extra row to know whether there is a next page
+        universities = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = None
+        if len(universities) > limit:
+            universities = universities[:limit]
+            next_cursor = encode_cursor(universities[-1].id)
+        return encode_university_rows([university_row_to_dict(u) for u in universities], "listing"), next_cursor
+
+    # Pages are cached already encoded, so a hit is sent as-is
+    key = ("universities", skip, limit, cursor, filters.cache_key())
+    content, next_cursor = await catalog_cache.aget_or_load(key, load)
+    return json_response(content, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@app.get("/universities/near")
+@cache_policy(CATALOG_CACHE_CONTROL)
+async def get_universities_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(None, gt=0),
+    limit: int = Query(20, ge=1, le=NEAR_MAX_LIMIT),
+    filters: UniversityFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Universities nearest to (lat, lon), optionally within radius_km, with the listing filters applied
+    """
+    index = await catalog_cache.aget_or_load(("geo_index",), lambda: load_geo_index(db))
+    allowed = None
+    if filters.is_active():
+        allowed = await catalog_cache.aget_or_load(
+            ("filtered_ids", filters.cache_key()), lambda: load_filtered_ids(db, filters)
+        )
+    return index.nearest(lat, lon, limit, radius_km, allowed)
+
+# Rows fetched per round trip while exporting; only one batch is held in memory at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "universities.ndjson"),
+    "csv": ("text/csv", "universities.csv"),
+    "parquet": ("application/vnd.apache.parquet", "universities.parquet"),
+}
+
+def export_batches(filters: UniversityFilters):
+    """
+    Yields the filtered catalog as lists of row mappings, EXPORT_BATCH_SIZE at a time.
+    yield_per streams from a server-side cursor on Postgres, so the full result is
+    never materialized. The session is owned here because the response body is
+    produced after the request's dependencies have finished.
+    """
+    db = SessionLocal()
+    try:
+        query = filters.apply(university_select()).order_by(University.id)
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.mappings().partitions():
+            yield partition
+    finally:
+        db.close()
+
+def export_ndjson(filters: UniversityFilters):
+    for batch in export_batches(filters):
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in batch)
+
+def export_csv(filters: UniversityFilters):
+    columns = [column.key for column in UNIVERSITY_COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in export_batches(filters):
+        writer.writerows([row[column] for column in columns] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class ExportSink(io.RawIOBase):
+    """Write-only file that collects what the parquet writer emits until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_parquet(filters: UniversityFilters, pa, pq):
+    arrow_types = {Integer: pa.int64(), Float: pa.float64(), Boolean: pa.bool_(), Text: pa.string(), String: pa.string()}
+    schema = pa.schema([(column.key, arrow_types[type(column.type)]) for column in UNIVERSITY_COLUMNS])
+    sink = ExportSink()
+    # Each batch becomes a row group; the footer is written on close
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in export_batches(filters):
+            writer.write_table(pa.Table.from_pylist([dict(row) for row in batch], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+@app.get("/universities/export")
+def export_universities(
+    export_format: str = Query("ndjson", alias="format"),
+    filters: UniversityFilters = Depends()
+):
+    """
+    Streams every university matching the listing filters as NDJSON, CSV or Parquet.
+    Parquet needs pyarrow, which is optional.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    media_type, filename = EXPORT_FORMATS[export_format]
+
+    if export_format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        body = export_parquet(filters, pa, pq)
+    elif export_format == "csv":
+        body = export_csv(filters)
+    else:
+        body = export_ndjson(filters)
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/universities/{university_id}")
-def get_university(university_id: int, db: Session = Depends(get_db)):
-    university = db.query(University).filter(University.id == university_id).first()
-    if university is None:
+@cache_policy(CATALOG_CACHE_CONTROL)
+async def get_university(university_id: int, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return orjson.dumps(await load_university(db, university_id))
+    return json_response(await catalog_cache.aget_or_load(("university", university_id), load))
+
+async def load_university(db: AsyncSession, university_id: int):
+    # Identity and degrees are outer-joined so the card is a single SELECT
+    result = await db.execute(
+        select(University, InstitutionIdentity, DegreeOffering)
+        .outerjoin(InstitutionIdentity, InstitutionIdentity.university_id == University.id)
+        .outerjoin(DegreeOffering, DegreeOffering.university_id == University.id)
+        .where(University.id == university_id)
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=404, detail="University not found")
-    
-    degrees = db.query(DegreeOffering).filter(DegreeOffering.university_id == university_id).first()
-    identity = db.query(InstitutionIdentity).filter(InstitutionIdentity.university_id == university_id).first()
-    
+    university, identity, degrees = row
+
     return {
         "university": {
             "id": university.id,
@@ -290,43 +1556,32 @@ def get_university(university_id: int, db: Session = Depends(get_db)):
     }
 
 @app.get("/universities/search/{name}")
-def search_universities(name: str, db: Session = Depends(get_db)):
-    universities = db.query(University).join(University.institution_identity).filter(University.name.ilike(f"%{name}%")).all()
-    return [{
-        "id": u.id,
-        "name": u.name,
-        "state": u.state,
-        "sector": u.sector,
-        "zip": u.zip,
-        "latitude": u.latitude,
-        "longitude": u.longitude,
-        "is_hbcu": u.institution_identity.is_hbcu if u.institution_identity else False,
-        "is_tribal": u.institution_identity.is_tribal if u.institution_identity else False,
-        "religious_affiliation": u.institution_identity.religious_affiliation if u.institution_identity else None,
-        "carnegie_classification": u.institution_identity.carnegie_classification if u.institution_identity else '',
-        "control_of_institution": u.institution_identity.control_of_institution if u.institution_identity else ''
-    } for u in universities]
+@cache_policy(CATALOG_CACHE_CONTROL)
+async def search_universities(
+    name: str,
+    limit: int = Query(50, ge=1, le=SEARCH_MAX_LIMIT),
+    prefix: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # The index is built once from the catalog and lives in the catalog cache,
+    # so it is rebuilt after the TTL or an invalidation
+    index = await catalog_cache.aget_or_load(("search_index",), lambda: load_name_search_index(db))
+    return json_response(encode_university_rows(index.search(name, limit, prefix_only=prefix), "card"))
 
 @app.get("/universities/state/{state}")
+@cache_policy(CATALOG_CACHE_CONTROL)
 def get_universities_by_state(state: str, db: Session = Depends(get_db)):
-    universities = db.query(University).join(University.institution_identity).filter(University.state == state).all()
-    return [{
-        "id": u.id,
-        "name": u.name,
-        "state": u.state,
-        "sector": u.sector,
-        "zip": u.zip,
-        "latitude": u.latitude,
-        "longitude": u.longitude,
-        "is_hbcu": u.institution_identity.is_hbcu if u.institution_identity else False,
-        "is_tribal": u.institution_identity.is_tribal if u.institution_identity else False,
-        "religious_affiliation": u.institution_identity.religious_affiliation if u.institution_identity else None,
-        "carnegie_classification": u.institution_identity.carnegie_classification if u.institution_identity else '',
-        "control_of_institution": u.institution_identity.control_of_institution if u.institution_identity else ''
-    } for u in universities]
+    def load():
+        universities = db.execute(university_select(UNIVERSITY_SUMMARY_COLUMNS).where(University.state == state)).all()
+        return encode_university_rows([university_row_to_dict(u) for u in universities], "card")
+    return json_response(catalog_cache.get_or_load(("state", state), load))
 
 @app.get("/universities/{university_id}/degrees")
+@cache_policy(CATALOG_CACHE_CONTROL)
 def get_university_degrees(university_id: int, db: Session = Depends(get_db)):
+    return catalog_cache.get_or_load(("degrees", university_id), lambda: load_university_degrees(db, university_id))
+
+def load_university_degrees(db: Session, university_id: int):
     degrees = db.query(DegreeOffering).filter(DegreeOffering.university_id == university_id).first()
     if degrees is None:
         raise HTTPException(status_code=404, detail="Degree offerings not found")
@@ -341,182 +1596,672 @@ def get_university_degrees(university_id: int, db: Session = Depends(get_db)):
         "highest_degree": degrees.highest_degree
     }
 
+# Wikipedia image resolution
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+COMMONS_API_URL = os.getenv("COMMONS_API_URL", "https://commons.wikimedia.org/w/api.php")
+
+# Resolved images are kept for IMAGE_CACHE_TTL seconds; "no image" results are retried sooner
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(30 * 24 * 3600)))
+IMAGE_CACHE_EMPTY_TTL = float(os.getenv("IMAGE_CACHE_EMPTY_TTL", str(24 * 3600)))
+
+# Keywords that typically indicate a campus/landmark image
+LANDMARK_KEYWORDS = [
+    'campus', 'building', 'hall', 'quad', 'library', 'tower', 'center', 'college', 'university', 'school',
+    'academic', 'administration', 'arena', 'auditorium', 'bell', 'chapel', 'clock', 'commons', 'convention',
+    'dormitory', 'dorm', 'education', 'faculty', 'field', 'fountain', 'garden', 'gymnasium', 'gym', 'institute',
+    'laboratory', 'lab', 'lecture', 'memorial', 'museum', 'observatory', 'pavilion', 'plaza', 'research',
+    'residence', 'science', 'stadium', 'student', 'theater', 'theatre', 'union', 'walk', 'walkway', 'wing'
+]
+LOGO_KEYWORDS = ['logo', 'icon', 'seal', 'shield']
+WEB_IMAGE_FORMATS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+
+# The MediaWiki API accepts up to 50 titles per query
+IMAGEINFO_BATCH_SIZE = 50
+
+NO_IMAGE = {
+    "image_url": "",
+    "alt_text": "No image available",
+    "attribution": ""
+}
+
+# Pooled HTTP session shared by every Wikipedia call, so connections are reused.
+# Created on first use so importing the app doesn't import requests.
+wiki_http = None
+wiki_http_lock = threading.Lock()
+
+def get_wiki_http():
+    global wiki_http
+    with wiki_http_lock:
+        if wiki_http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.headers["User-Agent"] = "UniversitiesAPI/1.0"
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            wiki_http = session
+    return wiki_http
+
+wiki_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="wiki")
+
+def submit_wiki(fn, *args):
+    # The task runs in a copy of the caller's context, so its HTTP timings count towards the request
+    return wiki_executor.submit(contextvars.copy_context().run, fn, *args)
+
+class RateLimiter:
+    """Spaces calls to wait() at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+# Set by batch jobs to throttle outbound calls; the API itself is not throttled
+wiki_rate_limiter = None
+
+def wiki_get(url: str, params: dict, raise_for_status: bool = True):
+    if wiki_rate_limiter is not None:
+        wiki_rate_limiter.wait()
+    start = time.perf_counter()
+    failed = True
+    try:
+        response = get_wiki_http().get(url, params={**params, "format": "json"}, timeout=10)
+        failed = False
+    finally:
+        record_outbound_http(url, time.perf_counter() - start, failed)
+    if raise_for_status:
+        response.raise_for_status()
+    elif response.status_code != 200:
+        return None
+    return response.json()
+
+def fetch_page_images(name: str):
+    # First, search for the university page, then list the images on it
+    search_data = wiki_get(WIKIPEDIA_API_URL, {"action": "query", "list": "search", "srsearch": name})
+    if not search_data['query']['search']:
+        print("No search results found")
+        return None
+
+    page_id = search_data['query']['search'][0]['pageid']
+    print(f"Found page ID: {page_id}")
+    images_data = wiki_get(WIKIPEDIA_API_URL, {"action": "query", "prop": "images", "pageids": page_id})
+    return images_data['query']['pages'][str(page_id)].get('images', [])
+
+def fetch_commons_images(name: str):
+    commons_data = wiki_get(
+        COMMONS_API_URL,
+        {"action": "query", "list": "categorymembers", "cmtitle": f"Category:{name}", "cmtype": "file"},
+        raise_for_status=False,
+    )
+    if commons_data and 'query' in commons_data and 'categorymembers' in commons_data['query']:
+        return [{'title': img['title']} for img in commons_data['query']['categorymembers']]
+    return []
+
+def fetch_related_images(name: str):
+    # Images from related pages (like "List of buildings at X University")
+    related_data = wiki_get(
+        WIKIPEDIA_API_URL,
+        {"action": "query", "generator": "search", "gsrsearch": f"{name} buildings", "gsrlimit": 5, "prop": "images"},
+        raise_for_status=False,
+    )
+    related_images = []
+    if related_data and 'query' in related_data and 'pages' in related_data['query']:
+        for page in related_data['query']['pages'].values():
+            related_images.extend(page.get('images', []))
+    return related_images
+
+def fetch_imageinfo(titles: List[str]):
+    """Returns {title: imageinfo} for the given file titles, batching them per request."""
+    def fetch_batch(batch):
+        data = wiki_get(WIKIPEDIA_API_URL, {
+            "action": "query",
+            "titles": "|".join(batch),
+            "prop": "imageinfo",
+            "iiprop": "url|extmetadata",
+        })
+        # Titles come back normalized (e.g. underscores to spaces); map them back
+        normalized = {n['to']: n['from'] for n in data['query'].get('normalized', [])}
+        return {
+            normalized.get(page['title'], page['title']): page['imageinfo'][0]
+            for page in data['query']['pages'].values()
+            if 'imageinfo' in page
+        }
+
+    batches = [titles[i:i + IMAGEINFO_BATCH_SIZE] for i in range(0, len(titles), IMAGEINFO_BATCH_SIZE)]
+    imageinfo = {}
+    for future in [submit_wiki(fetch_batch, batch) for batch in batches]:
+        imageinfo.update(future.result())
+    return imageinfo
+
+def select_campus_image(all_images: List[dict], imageinfo_loader=fetch_imageinfo):
+    """Picks the first web-friendly campus photo from the candidates, or None."""
+    # Filter images by title and filename keywords
+    landmark_images = []
+    for img in all_images:
+        title = img['title'].lower()
+        filename = title.split(':')[-1].lower()
+        if any(k in title or k in filename for k in LANDMARK_KEYWORDS):
+            landmark_images.append(img)
+    print(f"Found {len(landmark_images)} landmark images")
+
+    # If no landmark images found, use all images
+    images_to_check = landmark_images if landmark_images else all_images
+
+    # Only use web-friendly formats, each title once
+    titles = list(dict.fromkeys(
+        image['title'] for image in images_to_check
+        if any(image['title'].lower().endswith(ext) for ext in WEB_IMAGE_FORMATS)
+    ))
+    if not titles:
+        return None
+    imageinfo = imageinfo_loader(titles)
+
+    for image_title in titles:
+        image_info = imageinfo.get(image_title)
+        if image_info is None:
+            continue
+
+        # Check if this is a good image to use
+        if 'extmetadata' in image_info:
+            metadata = image_info['extmetadata']
+            # Skip if it's a logo or icon
+            if any(keyword in image_title.lower() for keyword in LOGO_KEYWORDS):
+                continue
+            # Skip if it's a person's photo
+            if 'ObjectName' in metadata and 'portrait' in metadata['ObjectName'].get('value', '').lower():
+                continue
+
+        print(f"Selected image: {image_title}")
+        return image_info['url']
+    return None
+
+def resolve_university_image(name: str):
+    """
+    Looks up a campus image for the university on Wikipedia and Commons.
+    Raises requests.exceptions.RequestException when Wikipedia can't be reached.
+    """
+    print(f"Searching for images for: {name}")
+
+    # The page, Commons category and related-page lookups are independent
+    page_images = submit_wiki(fetch_page_images, name)
+    commons_images = submit_wiki(fetch_commons_images, name)
+    related_images = submit_wiki(fetch_related_images, name)
+
+    main_images = page_images.result()
+    if main_images is None:
+        return dict(NO_IMAGE)
+    all_images = main_images + commons_images.result() + related_images.result()
+    print(f"Total images found: {len(all_images)}")
+
+    image_url = select_campus_image(all_images)
+    if image_url is None:
+        print("No suitable image found")
+        return dict(NO_IMAGE)
+    return {
+        "image_url": image_url,
+        "alt_text": f"Campus of {name}",
+        "attribution": "Image from Wikipedia"
+    }
+
+def image_is_fresh(image: UniversityImage):
+    ttl = IMAGE_CACHE_TTL if image.image_url else IMAGE_CACHE_EMPTY_TTL
+    return image.fetched_at is not None and (datetime.utcnow() - image.fetched_at).total_seconds() < ttl
+
+def store_university_image(db: Session, university_id: int, result: dict):
+    fetched_at = datetime.utcnow()
+    db.merge(UniversityImage(university_id=university_id, fetched_at=fetched_at, **result))
+    db.commit()
+    return fetched_at
+
 @app.get("/universities/{university_id}/image")
+@cache_policy(IMAGE_CACHE_CONTROL)
 def get_university_image(university_id: int, db: Session = Depends(get_db)):
     """
     Returns a university landmark/campus image from Wikipedia
     """
-    try:
-        # First get the university name from our database
-        university = db.query(University).filter(University.id == university_id).first()
-        if not university:
-            raise HTTPException(status_code=404, detail="University not found")
+    cached = db.query(UniversityImage).filter(UniversityImage.university_id == university_id).first()
+    if cached is not None and image_is_fresh(cached):
+        return json_response(orjson.dumps({
+            "image_url": cached.image_url,
+            "alt_text": cached.alt_text,
+            "attribution": cached.attribution
+        }), {"Last-Modified": http_date(cached.fetched_at)})
 
-        print(f"Searching for images for: {university.name}")
-
-        # Format university name for Wikipedia search
-        uni_name = university.name.replace(" ", "%20")
-        
-        # First, search for the university page
-        search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={uni_name}&format=json"
-        search_response = requests.get(search_url)
-        search_response.raise_for_status()
-        search_data = search_response.json()
-        
-        if not search_data['query']['search']:
-            print("No search results found")
-            return {
-                "image_url": "",
-                "alt_text": "No image available",
-                "attribution": ""
-            }
-            
-        # Get the first search result's page ID
-        page_id = search_data['query']['search'][0]['pageid']
-        print(f"Found page ID: {page_id}")
-        
-        # Keywords that typically indicate a campus/landmark image
-        landmark_keywords = [
-            'campus', 'building', 'hall', 'quad', 'library', 'tower', 'center', 'college', 'university', 'school',
-            'academic', 'administration', 'arena', 'auditorium', 'bell', 'chapel', 'clock', 'commons', 'convention',
-            'dormitory', 'dorm', 'education', 'faculty', 'field', 'fountain', 'garden', 'gymnasium', 'gym', 'institute',
-            'laboratory', 'lab', 'lecture', 'memorial', 'museum', 'observatory', 'pavilion', 'plaza', 'research',
-            'residence', 'science', 'stadium', 'student', 'theater', 'theatre', 'union', 'walk', 'walkway', 'wing'
-        ]
-        
-        all_images = []
-        
-        # 1. Get images from the main page
-        images_url = f"https://en.wikipedia.org/w/api.php?action=query&prop=images&pageids={page_id}&format=json"
-        images_response = requests.get(images_url)
-        images_response.raise_for_status()
-        images_data = images_response.json()
-        
-        if 'images' in images_data['query']['pages'][str(page_id)]:
-            main_images = images_data['query']['pages'][str(page_id)]['images']
-            print(f"Found {len(main_images)} images on main page")
-            all_images.extend(main_images)
-        
-        # 2. Get images from Commons category
-        commons_url = f"https://commons.wikimedia.org/w/api.php?action=query&list=categorymembers&cmtitle=Category:{uni_name}&cmtype=file&format=json"
-        commons_response = requests.get(commons_url)
-        if commons_response.status_code == 200:
-            commons_data = commons_response.json()
-            if 'query' in commons_data and 'categorymembers' in commons_data['query']:
-                commons_images = [{'title': img['title']} for img in commons_data['query']['categorymembers']]
-                print(f"Found {len(commons_images)} images in Commons")
-                all_images.extend(commons_images)
-        
-        # 3. Get images from related pages (like "List of buildings at X University")
-        related_url = f"https://en.wikipedia.org/w/api.php?action=query&generator=search&gsrsearch={uni_name}+buildings&gsrlimit=5&prop=images&format=json"
-        related_response = requests.get(related_url)
-        if related_response.status_code == 200:
-            related_data = related_response.json()
-            if 'query' in related_data and 'pages' in related_data['query']:
-                related_images = []
-                for page in related_data['query']['pages'].values():
-                    if 'images' in page:
-                        related_images.extend(page['images'])
-                print(f"Found {len(related_images)} images in related pages")
-                all_images.extend(related_images)
-        
-        print(f"Total images found: {len(all_images)}")
-        
-        # Filter images by title and filename keywords
-        landmark_images = []
-        for img in all_images:
-            title = img['title'].lower()
-            filename = title.split(':')[-1].lower()
-            matches = [k for k in landmark_keywords if k in title or k in filename]
-            if matches:
-                print(f"Found landmark image: {title} (matches: {matches})")
-                landmark_images.append(img)
-        
-        print(f"Found {len(landmark_images)} landmark images")
-        
-        # If no landmark images found, use all images
-        images_to_check = landmark_images if landmark_images else all_images
-        
-        # Get detailed info for each image to find the best one
-        for image in images_to_check:
-            image_title = image['title']
-            print(f"Checking image: {image_title}")
-            
-            # Only use web-friendly formats
-            web_formats = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-            if not any(image_title.lower().endswith(ext) for ext in web_formats):
-                print(f"Skipping {image_title} - not a web-friendly format")
-                continue
-                
-            image_url = f"https://en.wikipedia.org/w/api.php?action=query&titles={image_title}&prop=imageinfo&iiprop=url|extmetadata&format=json"
-            image_response = requests.get(image_url)
-            image_response.raise_for_status()
-            image_data = image_response.json()
-            
-            # Extract the actual image URL and metadata
-            page = next(iter(image_data['query']['pages'].values()))
-            if 'imageinfo' in page:
-                image_info = page['imageinfo'][0]
-                image_url = image_info['url']
-                
-                # Check if this is a good image to use
-                if 'extmetadata' in image_info:
-                    metadata = image_info['extmetadata']
-                    # Skip if it's a logo or icon
-                    if any(keyword in image_title.lower() for keyword in ['logo', 'icon', 'seal', 'shield']):
-                        print(f"Skipping {image_title} - identified as logo/icon")
-                        continue
-                    # Skip if it's a person's photo
-                    if 'ObjectName' in metadata and 'portrait' in metadata['ObjectName'].get('value', '').lower():
-                        print(f"Skipping {image_title} - identified as portrait")
-                        continue
-                        
-                print(f"Selected image: {image_title}")
-                return {
-                    "image_url": image_url,
-                    "alt_text": f"Campus of {university.name}",
-                    "attribution": "Image from Wikipedia"
-                }
-        
-        print("No suitable image found")
-        return {
-            "image_url": "",
-            "alt_text": "No image available",
-            "attribution": ""
-        }
+    # First get the university name from our database
+    name = db.query(University.name).filter(University.id == university_id).scalar()
+    if name is None:
+        raise HTTPException(status_code=404, detail="University not found")
+
+    import requests
 
+    try:
+        result = resolve_university_image(name)
     except requests.exceptions.RequestException as e:
+        # Not cached, here or by the client, so the next request retries Wikipedia
         print(f"Error making request to Wikipedia: {e}")
-        return {
-            "image_url": "",
-            "alt_text": "No image available",
-            "attribution": ""
-        }
+        return JSONResponse(content=NO_IMAGE, headers={"Cache-Control": "no-store"})
     except Exception as e:
         print(f"Unexpected error: {e}")
-        return {
-            "image_url": "",
-            "alt_text": "No image available",
-            "attribution": ""
-        }
+        return JSONResponse(content=NO_IMAGE, headers={"Cache-Control": "no-store"})
 
-@app.post("/swipes/")
-def create_swipe(
-    swipe_request: SwipeRequest = Body(...),
-    db: Session = Depends(get_db)
-):
-    # If it's a right swipe, create a match
-    if swipe_request.swipe_direction == "right":
-        match = UniversityMatch(university_id=swipe_request.university_id)
-        db.add(match)
-        db.commit()
-        db.refresh(match)
+    fetched_at = store_university_image(db, university_id, result)
+    return json_response(orjson.dumps(result), {"Last-Modified": http_date(fetched_at)})
+
+# Recommendations
+RECOMMENDATION_SCORE_FIELDS = [
+    ("sat_reading_25", "sat_reading_75"),
+    ("sat_math_25", "sat_math_75"),
+    ("act_composite_25", "act_composite_75"),
+]
+RECOMMENDATION_FLAG_FIELDS = ["is_hbcu", "is_tribal", "offers_bachelors", "offers_masters", "offers_doctorate"]
+# How strongly left swipes push the profile away from what was passed on
+RECOMMENDATION_LEFT_WEIGHT = float(os.getenv("RECOMMENDATION_LEFT_WEIGHT", "0.5"))
+
+class RecommendationModel:
+    """
+    Standardized feature matrix over the catalog, scored against the swipe profile.
+
+    The profile is the mean feature vector of right-swiped universities minus a
+    weighted mean of left-swiped ones. Every candidate is scored by cosine
+    similarity to it in one matrix-vector product. Swipes update the running
+    sums in place, so the matrix is never rebuilt for a new swipe.
+    """
+
+    def __init__(self, rows: List[dict], features):
+        import numpy as np
+
+        self.rows = rows
+        self.positions = {row["id"]: position for position, row in enumerate(rows)}
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.features = features / norms
+        self.right_sum = np.zeros(features.shape[1])
+        self.left_sum = np.zeros(features.shape[1])
+        self.right_count = 0
+        self.left_count = 0
+        self.swiped = np.zeros(len(rows), dtype=bool)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_catalog(cls, catalog: List[dict]):
+        import numpy as np
+
+        def column(field):
+            return np.array([row[field] for row in catalog], dtype=float)
+
+        # Score-range midpoints and the admit rate describe selectivity better than the raw bounds
+        with np.errstate(divide="ignore", invalid="ignore"):
+            admit_rate = column("admissions_total") / column("applicants_total")
+        sectors = sorted({row["sector"] for row in catalog if row["sector"] is not None})
+        features = np.column_stack(
+            [(column(low) + column(high)) / 2 for low, high in RECOMMENDATION_SCORE_FIELDS]
+            + [admit_rate, np.log1p(column("enrolled_total")), column("latitude"), column("longitude")]
+            + [column(field) for field in RECOMMENDATION_FLAG_FIELDS]
+            + [np.array([row["sector"] == sector for row in catalog], dtype=float) for sector in sectors]
+        )
+
+        # Standardize each column; missing values land on the column mean.
+        # Columns with no values at all warn here and end up as zeros.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(features, axis=0)
+            std = np.nanstd(features, axis=0)
+        std[~(std > 0)] = 1.0
+        features = np.nan_to_num((features - np.nan_to_num(mean)) / std)
+
+        summary_fields = [column.key for column in UNIVERSITY_SUMMARY_COLUMNS]
+        rows = [{field: row[field] for field in summary_fields} for row in catalog]
+        return cls(rows, features)
+
+    def record_swipe(self, university_id: int, swipe_direction: str):
+        position = self.positions.get(university_id)
+        if position is None:
+            return
+        with self._lock:
+            if swipe_direction == "right":
+                self.right_sum += self.features[position]
+                self.right_count += 1
+            else:
+                self.left_sum += self.features[position]
+                self.left_count += 1
+            self.swiped[position] = True
+
+    def recommend(self, limit: int):
+        import numpy as np
+
+        with self._lock:
+            profile = self.right_sum / max(self.right_count, 1)
+            if self.left_count:
+                profile = profile - RECOMMENDATION_LEFT_WEIGHT * self.left_sum / self.left_count
+            candidates = ~self.swiped
+
+        limit = min(limit, int(candidates.sum()))
+        if limit <= 0:
+            return []
+
+        # Without a profile yet, the deck is just the unswiped catalog in id order
+        norm = np.linalg.norm(profile)
+        if norm == 0:
+            top = np.flatnonzero(candidates)[:limit]
+            return [{**self.rows[position], "score": 0.0} for position in top]
+
+        scores = np.where(candidates, self.features @ (profile / norm), -np.inf)
+        # Only the top `limit` need sorting; ties keep catalog order
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [{**self.rows[position], "score": round(float(scores[position]), 6)} for position in top]
+
+async def load_recommendation_model(db: AsyncSession):
+    # Swipes recorded from here on are kept, so the ones the replay below misses can be applied
+    journal = []
+    with recommendation_lock:
+        recommendation_journals.append(journal)
+    try:
+        return await build_recommendation_model(db, journal)
+    finally:
+        with recommendation_lock:
+            recommendation_journals.remove(journal)
+
+async def build_recommendation_model(db: AsyncSession, journal: List[dict]):
+    # Every swipe stamped before started is buffered or being written by now, and every later one is in the journal
+    started = swipe_buffer.timestamp()
+    # Buffered and batch swipes have to reach user_swipes before the profile is replayed from it
+    await run_in_threadpool(swipe_buffer.try_flush)
+    await run_in_threadpool(swipe_buffer.wait_for_writes, started)
+    result = await db.execute(
+        university_select(UNIVERSITY_COLUMNS + [
+            DegreeOffering.offers_bachelors,
+            DegreeOffering.offers_masters,
+            DegreeOffering.offers_doctorate,
+        ])
+        .outerjoin(DegreeOffering, DegreeOffering.university_id == University.id)
+        .order_by(University.id)
+    )
+    # A university with several degree_offerings rows is featurized from the first
+    catalog = list({row.id: university_row_to_dict(row) for row in reversed(result.all())}.values())[::-1]
+    swipes = (await db.execute(
+        select(UserSwipe.university_id, UserSwipe.swipe_direction).where(UserSwipe.swipe_timestamp < started)
+    )).all()
+
+    def build():
+        model = RecommendationModel.from_catalog(catalog)
+        for university_id, swipe_direction in swipes:
+            model.record_swipe(university_id, swipe_direction)
+        return model
+    # The matrix build is CPU-bound, so keep it off the event loop
+    model = await run_in_threadpool(build)
+
+    with recommendation_lock:
+        # The rest arrived during the build; from now on record_swipes_for_recommendations updates the model.
+        # (A swipe another worker stamped before started but stored after the replay waits for the next build.)
+        for swipe in journal:
+            if swipe["swipe_timestamp"] >= started:
+                model.record_swipe(swipe["university_id"], swipe["swipe_direction"])
+        recommendation_models.add(model)
+    return model
 
+# Built models, held weakly so a model dropped from the cache stops being updated,
+# and the journals of builds in progress
+recommendation_models = weakref.WeakSet()
+recommendation_journals = []
+recommendation_lock = threading.Lock()
+
+def record_swipes_for_recommendations(swipes: List[dict]):
+    with recommendation_lock:
+        models = list(recommendation_models)
+        for journal in recommendation_journals:
+            journal.extend(swipes)
+    for model in models:
+        for swipe in swipes:
+            model.record_swipe(swipe["university_id"], swipe["swipe_direction"])
+
+# Swipe ingestion
+SWIPE_WRITE_BEHIND = env_flag("SWIPE_WRITE_BEHIND", True)
+SWIPE_FLUSH_INTERVAL = float(os.getenv("SWIPE_FLUSH_INTERVAL", "0.5"))
+SWIPE_FLUSH_SIZE = int(os.getenv("SWIPE_FLUSH_SIZE", "500"))
+
+def swipe_record(swipe_request: SwipeRequest):
+    # swipe_timestamp is set by SwipeBuffer.add() or write() on arrival, so buffered swipes keep the time they were made
+    return {
+        "university_id": swipe_request.university_id,
+        "swipe_direction": swipe_request.swipe_direction,
+        "notes": swipe_request.notes,
+    }
+
+def missing_university_ids(db: Session, university_ids):
+    """The ids with no university, checked against the cached id set before the database."""
+    def load():
+        return frozenset(db.execute(select(University.id)).scalars())
+
+    unknown = set(university_ids) - catalog_cache.get_or_load(("university_ids",), load)
+    if unknown:
+        # Universities added since the id set was loaded
+        unknown -= set(db.execute(select(University.id).where(University.id.in_(unknown))).scalars())
+    return unknown
+
+def insert_swipes(db: Session, swipes: List[dict]):
+    """Bulk-inserts the swipes, and a match for every right swipe, in one transaction."""
+    db.execute(insert(UserSwipe), swipes)
+    matches = [
+        {"university_id": swipe["university_id"], "match_timestamp": swipe["swipe_timestamp"]}
+        for swipe in swipes if swipe["swipe_direction"] == "right"
+    ]
+    if matches:
+        db.execute(insert(UniversityMatch), matches)
+    # The counters are updated in the same transaction, so they never drift from the rows
+    apply_swipe_stats(db, swipe_stats_deltas(swipes))
+    db.commit()
+    # Other workers' recommenders only learn about these swipes once they are stored
+    cache_sync.publish_swipes(swipes)
+
+class SwipeBuffer:
+    """
+    Write-behind buffer for single swipes. A background thread flushes them as one
+    bulk insert every flush_interval seconds, or sooner once max_size are waiting.
+    Until start() is called, add() writes through immediately.
+    """
+
+    def __init__(self, flush_interval: float, max_size: int):
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._pending = []
+        self._lock = threading.Lock()
+        # Stamps of the write() calls still in progress, and a condition signalled as they finish
+        self._writing = []
+        self._written = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, swipe: dict):
+        with self._lock:
+            # Stamped under the lock, so timestamp() orders it against a recommender build
+            swipe["swipe_timestamp"] = datetime.utcnow()
+            self._pending.append(swipe)
+            full = len(self._pending) >= self.max_size
+        if self._thread is None:
+            self.flush()
+        elif full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes out the buffered swipes. Rows the database rejects are dropped and logged;
+        on any other error the rest go back in the buffer for the next flush, and it raises.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+            except SWIPE_ROW_ERRORS:
+                # One bad row fails the whole batch, so find it by writing them one at a time
+                for position, swipe in enumerate(pending):
+                    try:
+                        self._write([swipe])
+                    except SWIPE_ROW_ERRORS as e:
+                        SWIPES_DROPPED.inc()
+                        print(f"Dropping swipe {swipe}: {e}")
+                    except Exception:
+                        self._requeue(pending[position:])
+                        raise
+            except Exception:
+                self._requeue(pending)
+                raise
+            return len(pending)
+
+    def write(self, db: Session, swipes: List[dict]):
+        """
+        Writes swipes straight through, bypassing the buffer. They are stamped under the
+        same lock as add(), so wait_for_writes() can hold a recommender build until they are stored.
+        """
+        with self._lock:
+            stamp = datetime.utcnow()
+            for swipe in swipes:
+                swipe["swipe_timestamp"] = stamp
+            self._writing.append(stamp)
+        try:
+            insert_swipes(db, swipes)
+        finally:
+            with self._lock:
+                self._writing.remove(stamp)
+                self._written.notify_all()
+
+    def timestamp(self):
+        """The current time, taken after every swipe already stamped by add() or write() is buffered or being written."""
+        with self._lock:
+            return datetime.utcnow()
+
+    def wait_for_writes(self, before: datetime):
+        """Waits until the write() calls stamped before `before` have finished."""
+        with self._written:
+            self._written.wait_for(lambda: all(stamp >= before for stamp in self._writing))
+
+    def try_flush(self):
+        """flush() for readers and the flusher: a failure is logged, and they go on without those swipes."""
+        try:
+            return self.flush()
+        except Exception as e:
+            print(f"Error flushing swipes: {e}")
+            return 0
+
+    def _write(self, swipes: List[dict]):
+        db = SessionLocal()
+        try:
+            insert_swipes(db, swipes)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _requeue(self, swipes: List[dict]):
+        # Put them back in front of anything that arrived meanwhile, for the next flush
+        with self._lock:
+            self._pending[:0] = swipes
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="swipe-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the flusher and writes out whatever is still buffered."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing swipes at shutdown, {len(self._pending)} not stored: {e}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.try_flush()
+
+# Errors that only the offending rows cause: constraint violations and out-of-range values
+SWIPE_ROW_ERRORS = (IntegrityError, DataError, OverflowError)
+
+swipe_buffer = SwipeBuffer(SWIPE_FLUSH_INTERVAL, SWIPE_FLUSH_SIZE)
+
+@app.on_event("startup")
+def start_swipe_buffer():
+    if SWIPE_WRITE_BEHIND:
+        swipe_buffer.start()
+
+@app.on_event("shutdown")
+def stop_swipe_buffer():
+    swipe_buffer.stop()
+
+@app.post("/swipes/")
+def create_swipe(swipe_request: SwipeRequest = Body(...), db: Session = Depends(get_db)):
+    if missing_university_ids(db, [swipe_request.university_id]):
+        raise HTTPException(status_code=404, detail="University not found")
+    # Recorded with a match if it's a right swipe, in the next bulk flush
+    swipe = swipe_record(swipe_request)
+    swipe_buffer.add(swipe)
+    record_swipes_for_recommendations([swipe])
     return {"message": "Swipe processed successfully"}
 
+@app.post("/swipes/batch")
+def create_swipes(swipe_requests: List[SwipeRequest] = Body(...), db: Session = Depends(get_db)):
+    missing = missing_university_ids(db, [swipe_request.university_id for swipe_request in swipe_requests])
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Universities not found: {sorted(missing)}")
+    swipes = [swipe_record(swipe_request) for swipe_request in swipe_requests]
+    if swipes:
+        swipe_buffer.write(db, swipes)
+        record_swipes_for_recommendations(swipes)
+    return {"message": "Swipes processed successfully", "count": len(swipes)}
+
 @app.get("/matches")
-def get_matches(db: Session = Depends(get_db)):
-    matches = db.query(UniversityMatch).order_by(UniversityMatch.match_timestamp.desc()).all()
+async def get_matches(
+    response: Response,
+    limit: int = Query(None, ge=1, le=LISTING_MAX_LIMIT),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Write out buffered swipes first so a new match shows up right away
+    await run_in_threadpool(swipe_buffer.try_flush)
+
+    query = select(UniversityMatch).order_by(UniversityMatch.match_timestamp.desc(), UniversityMatch.id.desc())
+
+    # Newest first, so the next page holds rows sorting before the cursor's (match_timestamp, id)
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor, cursor_timestamp, cursor_id)
+        query = query.filter(or_(
+            UniversityMatch.match_timestamp < last_timestamp,
+            and_(UniversityMatch.match_timestamp == last_timestamp, UniversityMatch.id < last_id)
+        ))
+
+    # Without a limit every match is returned, as before
+    if limit is None:
+        matches = (await db.execute(query)).scalars().all()
+    else:
+        matches = (await db.execute(query.limit(limit + 1))).scalars().all()
+        if len(matches) > limit:
+            matches = matches[:limit]
+            last = matches[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last.match_timestamp.isoformat(), last.id)
     return [{
         "id": match.id,
         "university_id": match.university_id,
@@ -530,11 +2275,401 @@ def delete_match(match_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Match not found")
     
     db.delete(match)
+    apply_swipe_stats(db, {match.university_id: {"left_swipes": 0, "right_swipes": 0, "matches": -1}})
     db.commit()
     return {"message": "Match deleted successfully"}
 
-@app.get("/sunburst-chart", response_class=HTMLResponse)
-def generate_sunburst_chart(db: Session = Depends(get_db)):
+# Swipe statistics
+# university_swipe_stats and swipe_stats_rollups hold running counts, incremented in
+# the transaction that writes the swipes. The endpoints read them instead of
+# aggregating user_swipes, so they cost O(rows returned) rather than O(swipes).
+SWIPE_COUNT_COLUMNS = ["left_swipes", "right_swipes", "matches"]
+SWIPE_STATS_SORTS = {"matches", "right_swipes", "left_swipes"}
+SWIPE_STATS_MAX_LIMIT = 200
+
+def swipe_stats_deltas(swipes: List[dict]):
+    deltas = defaultdict(lambda: dict.fromkeys(SWIPE_COUNT_COLUMNS, 0))
+    for swipe in swipes:
+        counts = deltas[swipe["university_id"]]
+        if swipe["swipe_direction"] == "right":
+            counts["right_swipes"] += 1
+            counts["matches"] += 1
+        elif swipe["swipe_direction"] == "left":
+            counts["left_swipes"] += 1
+    return deltas
+
+def rollup_swipe_stats(db: Session, per_university: dict):
+    """Sums per-university counts into {(state, sector): counts} using the catalog."""
+    rollups = defaultdict(lambda: dict.fromkeys(SWIPE_COUNT_COLUMNS, 0))
+    ids = list(per_university)
+    for start in range(0, len(ids), 10000):
+        places = db.execute(
+            select(University.id, University.state, University.sector).where(University.id.in_(ids[start:start + 10000]))
+        )
+        for university_id, state, sector in places:
+            counts = rollups[(state or "", sector or "")]
+            for column, value in per_university[university_id].items():
+                counts[column] += value
+    return rollups
+
+def upsert_swipe_counts(db: Session, model, key_columns: List[str], rows: List[dict]):
+    # Adds each row's counts to the stored row with the same key, creating it if needed
+    if not rows:
+        return
+    dialect_insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = dialect_insert(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: model.__table__.c[column] + statement.excluded[column] for column in SWIPE_COUNT_COLUMNS},
+    )
+    db.execute(statement, rows)
+
+def apply_swipe_stats(db: Session, deltas: dict):
+    """Adds {university_id: counts} to the per-university counters and their state/sector rollups."""
+    if not deltas:
+        return
+    upsert_swipe_counts(db, UniversitySwipeStats, ["university_id"], [
+        {"university_id": university_id, **counts} for university_id, counts in sorted(deltas.items())
+    ])
+    upsert_swipe_counts(db, SwipeStatsRollup, ["state", "sector"], [
+        {"state": state, "sector": sector, **counts}
+        for (state, sector), counts in sorted(rollup_swipe_stats(db, deltas).items())
+    ])
+
+def recompute_swipe_stats(db: Session):
+    """Per-university counts aggregated from user_swipes and university_matches."""
+    per_university = defaultdict(lambda: dict.fromkeys(SWIPE_COUNT_COLUMNS, 0))
+    swipes = db.execute(
+        select(
+            UserSwipe.university_id,
+            func.sum(case((UserSwipe.swipe_direction == "left", 1), else_=0)),
+            func.sum(case((UserSwipe.swipe_direction == "right", 1), else_=0)),
+        ).group_by(UserSwipe.university_id)
+    )
+    for university_id, left_swipes, right_swipes in swipes:
+        per_university[university_id]["left_swipes"] = int(left_swipes)
+        per_university[university_id]["right_swipes"] = int(right_swipes)
+    matches = db.execute(select(UniversityMatch.university_id, func.count()).group_by(UniversityMatch.university_id))
+    for university_id, count in matches:
+        per_university[university_id]["matches"] = count
+    return per_university
+
+def rebuild_swipe_stats(db: Session):
+    """Replaces the counters with a full recompute from the swipe history."""
+    per_university = {
+        university_id: counts for university_id, counts in recompute_swipe_stats(db).items() if university_id is not None
+    }
+    db.execute(delete(SwipeStatsRollup))
+    db.execute(delete(UniversitySwipeStats))
+    # Universities that were never swiped keep no row, as with incremental updates
+    apply_swipe_stats(db, per_university)
+    db.commit()
+    return len(per_university)
+
+def swipe_stats_dict(counts: dict):
+    swipes = counts["left_swipes"] + counts["right_swipes"]
+    return {**counts, "match_rate": round(counts["right_swipes"] / swipes, 4) if swipes else None}
+
+@app.get("/stats/swipes")
+def get_swipe_totals(db: Session = Depends(get_db)):
+    # Buffered swipes are written out first, so the counts include them
+    swipe_buffer.try_flush()
+    totals = db.execute(select(*(func.coalesce(func.sum(SwipeStatsRollup.__table__.c[column]), 0) for column in SWIPE_COUNT_COLUMNS))).one()
+    return swipe_stats_dict(dict(zip(SWIPE_COUNT_COLUMNS, totals)))
+
+@app.get("/stats/swipes/universities")
+def get_top_swiped_universities(
+    sort: str = "matches",
+    limit: int = Query(20, ge=1, le=SWIPE_STATS_MAX_LIMIT),
+    db: Session = Depends(get_db)
+):
+    """
+    Universities with the most matches (or right or left swipes), highest first
+    """
+    if sort not in SWIPE_STATS_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(sorted(SWIPE_STATS_SORTS))}")
+    swipe_buffer.try_flush()
+    rows = db.execute(
+        select(UniversitySwipeStats, University.name, University.state, University.sector)
+        .join(University, University.id == UniversitySwipeStats.university_id)
+        .order_by(UniversitySwipeStats.__table__.c[sort].desc(), UniversitySwipeStats.university_id)
+        .limit(limit)
+    ).all()
+    return [{
+        "university_id": stats.university_id,
+        "name": name,
+        "state": state,
+        "sector": sector,
+        **swipe_stats_dict({column: getattr(stats, column) for column in SWIPE_COUNT_COLUMNS}),
+    } for stats, name, state, sector in rows]
+
+@app.get("/stats/swipes/universities/{university_id}")
+def get_university_swipe_stats(university_id: int, db: Session = Depends(get_db)):
+    swipe_buffer.try_flush()
+    stats = db.get(UniversitySwipeStats, university_id)
+    if stats is None:
+        if db.get(University, university_id) is None:
+            raise HTTPException(status_code=404, detail="University not found")
+        counts = dict.fromkeys(SWIPE_COUNT_COLUMNS, 0)
+    else:
+        counts = {column: getattr(stats, column) for column in SWIPE_COUNT_COLUMNS}
+    return {"university_id": university_id, **swipe_stats_dict(counts)}
+
+@app.get("/stats/swipes/states")
+def get_swipe_stats_by_state(db: Session = Depends(get_db)):
+    return swipe_stats_rollup_by(db, SwipeStatsRollup.state, "state")
+
+@app.get("/stats/swipes/sectors")
+def get_swipe_stats_by_sector(db: Session = Depends(get_db)):
+    return swipe_stats_rollup_by(db, SwipeStatsRollup.sector, "sector")
+
+def swipe_stats_rollup_by(db: Session, column, name: str):
+    swipe_buffer.try_flush()
+    rows = db.execute(
+        select(column, *(func.sum(SwipeStatsRollup.__table__.c[count]) for count in SWIPE_COUNT_COLUMNS))
+        .group_by(column)
+        .order_by(column)
+    )
+    return [
+        {name: value or None, **swipe_stats_dict(dict(zip(SWIPE_COUNT_COLUMNS, map(int, counts))))}
+        for value, *counts in rows
+    ]
+
+@app.get("/stats/swipes/check")
+def check_swipe_stats(db: Session = Depends(get_db)):
+    """
+    Compares the counters with a full recompute from the swipe history. This scans
+    user_swipes, so it is meant for occasional checks, not for clients.
+    """
+    swipe_buffer.try_flush()
+
+    def nonzero(counts_by_key):
+        return {key: dict(counts) for key, counts in counts_by_key.items() if any(counts.values())}
+
+    expected = nonzero({key: counts for key, counts in recompute_swipe_stats(db).items() if key is not None})
+    stored = nonzero({
+        stats.university_id: {column: getattr(stats, column) for column in SWIPE_COUNT_COLUMNS}
+        for stats in db.execute(select(UniversitySwipeStats)).scalars()
+    })
+    expected_rollups = nonzero(rollup_swipe_stats(db, expected))
+    stored_rollups = nonzero({
+        (rollup.state, rollup.sector): {column: getattr(rollup, column) for column in SWIPE_COUNT_COLUMNS}
+        for rollup in db.execute(select(SwipeStatsRollup)).scalars()
+    })
+
+    mismatches = [
+        {"university_id": key, "stored": stored.get(key), "expected": expected.get(key)}
+        for key in sorted(expected.keys() | stored.keys()) if stored.get(key) != expected.get(key)
+    ]
+    rollup_mismatches = [
+        {"state": key[0] or None, "sector": key[1] or None, "stored": stored_rollups.get(key), "expected": expected_rollups.get(key)}
+        for key in sorted(expected_rollups.keys() | stored_rollups.keys()) if stored_rollups.get(key) != expected_rollups.get(key)
+    ]
+    return {
+        "consistent": not mismatches and not rollup_mismatches,
+        "universities_checked": len(expected.keys() | stored.keys()),
+        "mismatches": mismatches[:100],
+        "rollup_mismatches": rollup_mismatches[:100],
+    }
+
+@app.post("/stats/swipes/rebuild")
+def rebuild_swipe_stats_endpoint(db: Session = Depends(get_db)):
+    # Repairs the counters after swipes were written around the API (e.g. a bulk import)
+    swipe_buffer.try_flush()
+    return {"message": "Swipe statistics rebuilt", "universities": rebuild_swipe_stats(db)}
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of request, SQL, outbound HTTP, pool and cache metrics."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += render_pool_metrics({"sync": engine.pool, "async": async_engine.pool if async_engine is not None else None})
+    cache = catalog_cache.stats()
+    lines += [
+        "# HELP catalog_cache_hits_total Catalog cache hits.", "# TYPE catalog_cache_hits_total counter",
+        f"catalog_cache_hits_total {cache['hits']}",
+        "# HELP catalog_cache_misses_total Catalog cache misses.", "# TYPE catalog_cache_misses_total counter",
+        f"catalog_cache_misses_total {cache['misses']}",
+        "# HELP catalog_cache_entries Entries in the catalog cache.", "# TYPE catalog_cache_entries gauge",
+        f"catalog_cache_entries {cache['size']}",
+    ]
+    return Response(content="\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/recommendations")
+async def get_recommendations(limit: int = 20, db: AsyncSession = Depends(get_async_db)):
+    """
+    Unswiped universities ranked by similarity to the right-swipe history
+    """
+    model = await catalog_cache.aget_or_load(("recommender",), lambda: load_recommendation_model(db))
+    return model.recommend(limit)
+
+@app.get("/admin/cache")
+def get_catalog_cache_stats():
+    return catalog_cache.stats()
+
+@app.post("/admin/cache/invalidate")
+def invalidate_catalog_cache(university_id: int = None):
+    removed = invalidate_catalog(university_id)
+    # Every other worker drops the same entries from its own cache
+    cache_sync.publish({"kind": "catalog", "university_id": university_id})
+    return {"message": "Catalog cache invalidated", "removed": removed}
+
+def invalidate_catalog(university_id: int = None):
+    # A single university drops its own entries plus every query result that may list it
+    if university_id is None:
+        return catalog_cache.invalidate()
+    return catalog_cache.invalidate(
+        lambda key: key[0] not in CATALOG_ENTITY_KINDS or key[1] == university_id
+    )
+
+# Cross-worker cache coherence
+# Each worker process has its own catalog_cache. With CACHE_SYNC on (set by
+# `python api.py serve` when it starts more than one worker; set it yourself under
+# gunicorn's UvicornWorker), changes made through one worker are broadcast so the
+# others apply them too. On Postgres the events go
+# over LISTEN/NOTIFY. Elsewhere, or behind PgBouncer (which can't hold a LISTEN),
+# they go through the cache_invalidations table, which every worker polls.
+# Image results live in the university_images table, so they are shared already.
+CACHE_SYNC = env_flag("CACHE_SYNC", False)
+CACHE_SYNC_CHANNEL = "catalog_cache"
+CACHE_SYNC_POLL_INTERVAL = float(os.getenv("CACHE_SYNC_POLL_INTERVAL", "1.0"))
+# NOTIFY payloads are capped at 8000 bytes; larger swipe batches just drop the recommender
+CACHE_SYNC_MAX_PAYLOAD = 7000
+# Polled events are kept this long, so a worker that stalls briefly still sees them
+CACHE_SYNC_RETENTION = 3600
+
+def apply_cache_event(event: dict):
+    if event["kind"] == "catalog":
+        invalidate_catalog(event.get("university_id"))
+    elif event["kind"] == "swipes":
+        record_swipes_for_recommendations([
+            {"university_id": university_id, "swipe_direction": swipe_direction, "swipe_timestamp": datetime.fromisoformat(timestamp)}
+            for university_id, swipe_direction, timestamp in event["swipes"]
+        ])
+    elif event["kind"] == "recommender":
+        catalog_cache.invalidate(lambda key: key[0] == "recommender")
+
+class CacheSync:
+    """
+    Broadcasts cache events to the other workers and applies theirs from a
+    background thread. Events from this process are skipped on receipt, since
+    they were applied when they happened. Until start() is called, publish() does nothing.
+    """
+
+    def __init__(self):
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._thread = None
+        self._stopping = threading.Event()
+        self._notify = False
+
+    def start(self):
+        if self._thread is None:
+            self._notify = engine.dialect.name == "postgresql" and not DB_PGBOUNCER
+            self._stopping.clear()
+            target = self._listen if self._notify else self._poll
+            self._thread = threading.Thread(target=target, name="cache-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def publish(self, event: dict):
+        if self._thread is None:
+            return
+        payload = json.dumps({"origin": self.origin, **event})
+        try:
+            with engine.begin() as connection:
+                if self._notify:
+                    connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CACHE_SYNC_CHANNEL, "payload": payload})
+                else:
+                    connection.execute(insert(CacheInvalidation), {"origin": self.origin, "payload": payload})
+                    cutoff = datetime.utcnow() - timedelta(seconds=CACHE_SYNC_RETENTION)
+                    connection.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < cutoff))
+        except Exception as e:
+            # The change already happened here; the other workers catch up at their cache TTL
+            print(f"Error publishing cache event: {e}")
+
+    def publish_swipes(self, swipes: List[dict]):
+        if self._thread is None:
+            return
+        event = {"kind": "swipes", "swipes": [
+            [swipe["university_id"], swipe["swipe_direction"], swipe["swipe_timestamp"].isoformat()] for swipe in swipes
+        ]}
+        if len(json.dumps(event)) > CACHE_SYNC_MAX_PAYLOAD:
+            event = {"kind": "recommender"}
+        self.publish(event)
+
+    def receive(self, payload: str):
+        event = json.loads(payload)
+        if event.pop("origin", None) != self.origin:
+            apply_cache_event(event)
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                # A connection of its own, taken out of the pool for as long as it listens
+                connection = engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f"LISTEN {CACHE_SYNC_CHANNEL}")
+                # Anything sent while not listening was missed, so start from an empty cache
+                catalog_cache.invalidate()
+                while not self._stopping.is_set():
+                    if select_module.select([dbapi_connection], [], [], CACHE_SYNC_POLL_INTERVAL) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        self.receive(dbapi_connection.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Cache sync listener failed, reconnecting: {e}")
+                self._stopping.wait(CACHE_SYNC_POLL_INTERVAL)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def _poll(self):
+        last_id = None
+        while not self._stopping.is_set():
+            try:
+                with SessionLocal() as db:
+                    if last_id is None:
+                        last_id = db.execute(select(func.coalesce(func.max(CacheInvalidation.id), 0))).scalar()
+                    events = db.execute(
+                        select(CacheInvalidation.id, CacheInvalidation.payload)
+                        .where(CacheInvalidation.id > last_id)
+                        .order_by(CacheInvalidation.id)
+                    ).all()
+                for event_id, payload in events:
+                    self.receive(payload)
+                    last_id = event_id
+            except Exception as e:
+                print(f"Error polling cache events: {e}")
+            self._stopping.wait(CACHE_SYNC_POLL_INTERVAL)
+
+cache_sync = CacheSync()
+
+@app.on_event("startup")
+def start_cache_sync():
+    if CACHE_SYNC:
+        cache_sync.start()
+
+@app.on_event("shutdown")
+def stop_cache_sync():
+    cache_sync.stop()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    # aiosqlite connections run on non-daemon threads that would keep the worker from exiting
+    if async_engine is not None:
+        await async_engine.dispose()
+
+def load_sunburst_aggregate(db: Session):
     data = (
         db.query(
             University.state,
@@ -544,11 +2679,30 @@ def generate_sunburst_chart(db: Session = Depends(get_db)):
         )
         .join(DegreeOffering, University.id == DegreeOffering.university_id)
         .group_by(University.state, University.sector, DegreeOffering.highest_degree)
+        .order_by(University.state, University.sector, DegreeOffering.highest_degree)
         .all()
     )
+    rows = [
+        {"state": state, "sector": sector, "highest_degree": highest_degree, "count": count}
+        for state, sector, highest_degree, count in data
+    ]
+    # The ETag is a hash of the aggregate, so it only changes when the data does
+    etag = '"' + hashlib.sha1(json.dumps(rows).encode()).hexdigest() + '"'
+    return rows, etag
+
+def sunburst_aggregate(db: Session):
+    return catalog_cache.get_or_load(("sunburst",), lambda: load_sunburst_aggregate(db))
+
+def render_sunburst_html(rows):
+    # pandas and plotly take seconds to import, so only the first render pays for them
+    import pandas as pd
+    import plotly.express as px
 
     # Convert data to a DataFrame
-    df = pd.DataFrame(data, columns=["State", "Sector", "Highest Degree", "Count"])
+    df = pd.DataFrame(
+        [(row["state"], row["sector"], row["highest_degree"], row["count"]) for row in rows],
+        columns=["State", "Sector", "Highest Degree", "Count"]
+    )
 
     # Create a sunburst chart using Plotly
     fig = px.sunburst(
@@ -559,11 +2713,51 @@ def generate_sunburst_chart(db: Session = Depends(get_db)):
     )
 
     # Generate the HTML for the chart
-    chart_html = fig.to_html(full_html=False)
+    return fig.to_html(full_html=False)
+
+@app.get("/sunburst-chart", response_class=HTMLResponse)
+def generate_sunburst_chart(request: Request, db: Session = Depends(get_db)):
+    rows, etag = sunburst_aggregate(db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
 
-    # Return the chart as an HTML response
-    return HTMLResponse(content=chart_html)
+    # The rendered chart is memoized per ETag, so Plotly only runs when the data changes
+    chart_html = catalog_cache.get_or_load(("sunburst_html", etag), lambda: render_sunburst_html(rows))
+    return HTMLResponse(content=chart_html, headers=headers)
+
+@app.get("/sunburst-chart/data")
+def get_sunburst_data(request: Request, db: Session = Depends(get_db)):
+    """
+    The aggregate behind the sunburst chart, for clients that render it themselves
+    """
+    rows, etag = sunburst_aggregate(db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=rows, headers=headers)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import argparse
+
+    # `python api.py migrate` only creates the schema; `python api.py` creates it and serves
+    # in this process; `python api.py serve` runs several worker processes
+    parser = argparse.ArgumentParser(description="Universities API")
+    parser.add_argument("command", nargs="?", choices=["migrate", "serve"])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1,
+                        help="worker processes for serve (default: WEB_CONCURRENCY or the CPU count)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    create_schema()
+    if args.command == "serve":
+        import uvicorn
+
+        # Each worker imports the app and keeps its own caches, kept coherent by CacheSync
+        if args.workers > 1:
+            os.environ["CACHE_SYNC"] = "1"
+        uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+    elif args.command is None:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+Benchmark suite: a synthetic catalog generator, a local Wikipedia stub and a load
+driver that reports latency percentiles and throughput as JSON.
+
+The commands use DATABASE_URL, like the API:
+
+    python -m bench.dataset --rows 100000 --swipes 50000 --reset
+    python -m bench.run --requests 5000 --concurrency 16 --reset-writes --output results.json
+    python -m bench.workers --workers 1,2,4,8 --concurrency 64
+    python -m bench.search --queries 200
+    python -m bench.concurrency --clients 1,10,100 --baseline before.json
+    python -m bench.swipes --swipes 5000 --threads 8
+    python -m bench.recommender --sizes 10000,50000,100000
+    python -m bench.geo --rows 100000
+    python -m bench.columnar --requests 500 --concurrency 16
+    python -m bench.serialize --sizes 100,5000
+
+Runs are seeded, so the same arguments produce the same dataset and request
+sequence, and results can be compared across commits. bench.run also needs
+httpx, which the API itself does not.
+"""
@@ -0,0 +1,110 @@
+"""
+Compares the listing's two filter engines (CATALOG_FILTER_ENGINE) on the catalog
+in DATABASE_URL:
+
+- cold: --concurrency identical requests against an empty cache at once, and how
+  many columnar builds they caused (one, since loads are single-flight)
+- warm: per-request latency over bench.run's listing filters, with the page
+  cache dropped before every request so each one is filtered again
+- memory: what the columnar copy of the catalog holds, traced while building it
+
+Usage: python -m bench.columnar [--requests 500] [--concurrency 16] [--output columnar.json]
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+import api
+from bench.run import LISTING_FILTERS, add_report_arguments, summarize, write_report
+
+
+async def listing(client, params: dict):
+    start = time.perf_counter()
+    response = await client.get("/universities/", params=params)
+    return time.perf_counter() - start, response.status_code == 200
+
+
+async def measure(engine: str, plan: list, concurrency: int):
+    import httpx
+
+    api.CATALOG_FILTER_ENGINE = engine
+    api.catalog_cache.invalidate()
+    builds = []
+    load = api.load_columnar_catalog
+
+    async def counting_load(db):
+        builds.append(1)
+        return await load(db)
+
+    api.load_columnar_catalog = counting_load
+    try:
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            cold_params = dict(limit="50")
+            started = time.perf_counter()
+            cold = await asyncio.gather(*(listing(client, cold_params) for _ in range(concurrency)))
+            cold_seconds = time.perf_counter() - started
+
+            warm = []
+            for params in plan:
+                # Only the page is dropped; the columnar catalog stays
+                api.catalog_cache.invalidate(lambda key: key[0] == "universities")
+                warm.append(await listing(client, params))
+    finally:
+        api.load_columnar_catalog = load
+    return {
+        "cold": dict(summarize(cold), wall_seconds=round(cold_seconds, 3), columnar_builds=len(builds)),
+        "warm": summarize(warm),
+    }
+
+
+async def columnar_memory():
+    """Bytes allocated while building the columnar catalog that are still held once it is built."""
+    async with api.get_async_sessionmaker()() as db:
+        tracemalloc.start()
+        catalog = await api.load_columnar_catalog(db)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    del catalog
+    return {"held_mb": round(current / 2**20, 1), "peak_mb": round(peak / 2**20, 1)}
+
+
+async def run(args, plan: list):
+    await api.app.router.startup()
+    try:
+        results = {engine: await measure(engine, plan, args.concurrency) for engine in ("sql", "memory")}
+        results["memory"]["catalog_memory"] = await columnar_memory()
+        return results
+    finally:
+        await api.app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQL and in-memory listing filters")
+    parser.add_argument("--requests", type=int, default=500, help="warm requests per engine")
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous cold requests")
+    add_report_arguments(parser, "random seed for the filters")
+    args = parser.parse_args()
+
+    api.create_schema()
+    rng = random.Random(args.seed)
+    plan = [dict(rng.choice(LISTING_FILTERS), limit="50") for _ in range(args.requests)]
+    results = asyncio.run(run(args, plan))
+    for engine, result in results.items():
+        print(f"{engine}: cold p50 {result['cold']['p50_ms']} ms, warm p50 {result['warm']['p50_ms']} ms")
+
+    with api.SessionLocal() as db:
+        universities = db.query(api.University).count()
+    write_report({
+        "database": api.engine.dialect.name,
+        "universities": universities,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
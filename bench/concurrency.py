@@ -0,0 +1,99 @@
+"""
+Measures read throughput as concurrent clients grow: starts the API with uvicorn
+(one worker), sends the same seeded listing and detail requests at each client
+count, and prints requests/s and latency percentiles as JSON.
+
+The catalog cache is turned off by default (CATALOG_CACHE_SIZE=0) so every request
+reaches the database, which is what the async engine changes; pass --with-cache to
+keep it. --app-dir runs the API from another checkout, and --baseline compares with
+a report saved from one, e.g. from before the async engine:
+
+    git worktree add /tmp/before 38b201e~1
+    python -m bench.concurrency --app-dir /tmp/before --output before.json
+    python -m bench.concurrency --baseline before.json
+
+Usage: python -m bench.concurrency [--clients 1,10,100] [--requests 2000] [--baseline before.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+
+import api
+from bench.run import add_report_arguments, load_catalog, parse_mix, plan_requests, summarize, write_report
+from bench.workers import ROOT, free_port, measure, wait_until_ready
+
+# Reads served by the async engine
+DEFAULT_MIX = {"listing": 50, "detail": 50}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read throughput at several client counts")
+    parser.add_argument("--clients", default="1,10,100", help="comma-separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per client count")
+    parser.add_argument("--warmup", type=int, default=200, help="requests sent first and not measured")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="weights, e.g. listing=50,detail=50")
+    parser.add_argument("--with-cache", action="store_true", help="keep the catalog cache on")
+    parser.add_argument("--app-dir", default=ROOT, help="checkout to run api.py from")
+    parser.add_argument("--baseline", help="a saved report to compare throughput with")
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    ids, names = load_catalog(api)
+    env = dict(os.environ)
+    if not args.with_cache:
+        env["CATALOG_CACHE_SIZE"] = "0"
+
+    results = []
+    for clients in [int(count) for count in args.clients.split(",")]:
+        # The same requests at every client count
+        rng = random.Random(args.seed)
+        warmup = plan_requests(rng, args.mix, args.warmup, ids, names)
+        plan = plan_requests(rng, args.mix, args.requests, ids, names)
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=args.app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(process, base_url)
+            samples_by_kind, elapsed = asyncio.run(measure(base_url, plan, warmup, clients))
+        finally:
+            process.terminate()
+            process.wait()
+
+        samples = [sample for kind_samples in samples_by_kind.values() for sample in kind_samples]
+        results.append({
+            "clients": clients,
+            "duration_seconds": round(elapsed, 3),
+            "throughput_rps": round(len(samples) / elapsed, 1),
+            "overall": summarize(samples),
+        })
+        print(f"{clients} clients: {results[-1]['throughput_rps']} requests/s", file=sys.stderr)
+
+    report = {
+        "database": api.engine.dialect.name,
+        "universities": len(ids),
+        "requests": args.requests,
+        "catalog_cache": args.with_cache,
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result["clients"]: result for result in json.load(f)["results"]}
+        for result in results:
+            before = baseline.get(result["clients"])
+            if before:
+                result["baseline_rps"] = before["throughput_rps"]
+                result["speedup"] = round(result["throughput_rps"] / before["throughput_rps"], 2)
+
+    write_report(report, args.output, args.app_dir)
+
+
+if __name__ == "__main__":
+    main()
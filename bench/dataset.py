@@ -0,0 +1,239 @@
+"""
+Fills the database behind DATABASE_URL with a synthetic catalog and swipe history.
+
+Values follow the shape of the real IPEDS data (sectors, SAT/ACT ranges, degree
+mixes) closely enough for the filters, search and chart to do realistic work.
+
+It also records the run in a bench_dataset table, which marks the database as a
+generated one: bench.run only deletes its own writes from a database carrying it.
+
+Usage: python -m bench.dataset [--rows 10000] [--swipes 10000] [--seed 1] [--reset]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import TIMESTAMP, Column, Integer, MetaData, Table, delete, func, insert, inspect, select, text
+
+import api
+
+STATES = [
+    "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "DC", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS",
+    "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC",
+    "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY",
+]
+# (sector, control, weight)
+SECTORS = [
+    ("Public, 4-year or above", "Public", 20),
+    ("Private not-for-profit, 4-year or above", "Private not-for-profit", 25),
+    ("Private for-profit, 4-year or above", "Private for-profit", 10),
+    ("Public, 2-year", "Public", 25),
+    ("Private not-for-profit, 2-year", "Private not-for-profit", 5),
+    ("Private for-profit, 2-year", "Private for-profit", 15),
+]
+RELIGIOUS_AFFILIATIONS = ["Roman Catholic", "Baptist", "Methodist", "Presbyterian", "Lutheran", "Jewish", "Evangelical"]
+CARNEGIE_CLASSIFICATIONS = [
+    "Doctoral Universities: Very High Research Activity",
+    "Doctoral Universities: High Research Activity",
+    "Master's Colleges & Universities: Larger Programs",
+    "Baccalaureate Colleges: Arts & Sciences Focus",
+    "Associate's Colleges: High Transfer",
+    "Special Focus Four-Year: Other Health Professions Schools",
+]
+PLACES = [
+    "Springfield", "Riverside", "Franklin", "Greenville", "Clinton", "Fairview", "Salem", "Madison",
+    "Georgetown", "Arlington", "Ashland", "Burlington", "Manchester", "Oxford", "Jackson", "Milton",
+    "Lakewood", "Hudson", "Chester", "Marion", "Dayton", "Lexington", "Bristol", "Newport", "Auburn",
+    "Dover", "Kingston", "Mount Vernon", "Cedar Falls", "Pine Bluff", "Rock Hill", "Eagle Pass",
+]
+NAME_PATTERNS = [
+    "University of {place}", "{place} State University", "{place} College", "{place} Community College",
+    "{place} Institute of Technology", "{place} University", "College of {place}", "{place} Technical College",
+]
+HIGHEST_DEGREES = ["Associate's degree", "Bachelor's degree", "Master's degree", "Doctor's degree - research/scholarship"]
+# Chunk size for the bulk inserts
+BATCH_SIZE = 10000
+# Generated swipes are dated up to this time; anything later was written by a benchmark run
+DATASET_NOW = datetime(2024, 1, 1)
+# Written by generate(), outside the API's metadata so create_schema() never makes it
+DATASET_MARKER = Table(
+    "bench_dataset", MetaData(),
+    Column("rows", Integer, nullable=False),
+    Column("swipes", Integer, nullable=False),
+    Column("seed", Integer, nullable=False),
+    Column("generated_at", TIMESTAMP, nullable=False),
+)
+
+
+def university_rows(rng: random.Random, start: int, count: int):
+    universities, identities, degrees = [], [], []
+    for university_id in range(start, start + count):
+        sector, control, _ = rng.choices(SECTORS, weights=[weight for *_, weight in SECTORS])[0]
+        four_year = "4-year" in sector
+        place = rng.choice(PLACES)
+        name = rng.choice(NAME_PATTERNS).format(place=place)
+        # Many real names repeat across states; a suffix keeps a share of them distinct
+        if rng.random() < 0.5:
+            name = f"{name} {rng.choice(['North', 'South', 'East', 'West', 'Central'])}"
+        applicants = float(rng.randint(200, 60000))
+        admitted = applicants * rng.uniform(0.05, 1.0)
+        sat_math = rng.gauss(560, 70) if four_year and rng.random() < 0.7 else None
+        sat_reading = rng.gauss(570, 60) if sat_math is not None else None
+        act = rng.gauss(23, 4) if four_year and rng.random() < 0.6 else None
+        universities.append({
+            "id": university_id,
+            "name": name,
+            "state": rng.choice(STATES),
+            "sector": sector,
+            "zip": f"{rng.randint(1000, 99999):05d}",
+            "latitude": rng.uniform(25.0, 49.0),
+            "longitude": rng.uniform(-124.0, -67.0),
+            "applicants_total": applicants,
+            "admissions_total": round(admitted),
+            "enrolled_total": round(admitted * rng.uniform(0.1, 0.6)),
+            "pct_submit_sat": rng.uniform(0, 100) if sat_math is not None else None,
+            "pct_submit_act": rng.uniform(0, 100) if act is not None else None,
+            "sat_reading_25": round(sat_reading - 60) if sat_reading is not None else None,
+            "sat_reading_75": round(sat_reading + 60) if sat_reading is not None else None,
+            "sat_math_25": round(sat_math - 60) if sat_math is not None else None,
+            "sat_math_75": round(sat_math + 60) if sat_math is not None else None,
+            "sat_writing_25": None,
+            "sat_writing_75": None,
+            "act_composite_25": round(act - 3) if act is not None else None,
+            "act_composite_75": round(act + 3) if act is not None else None,
+            "description": f"{name} is a {sector.lower()} institution in {place}.",
+            "website": f"www.{place.lower().replace(' ', '')}{university_id}.edu",
+            "phone_number": f"{rng.randint(200, 999)}555{rng.randint(1000, 9999)}",
+        })
+        identities.append({
+            "id": university_id,
+            "university_id": university_id,
+            "is_hbcu": rng.random() < 0.015,
+            "is_tribal": rng.random() < 0.005,
+            "religious_affiliation": rng.choice(RELIGIOUS_AFFILIATIONS) if control == "Private not-for-profit" and rng.random() < 0.5 else None,
+            "carnegie_classification": rng.choice(CARNEGIE_CLASSIFICATIONS[:4] if four_year else CARNEGIE_CLASSIFICATIONS[4:]),
+            "control_of_institution": control,
+        })
+        masters = four_year and rng.random() < 0.6
+        doctorate = masters and rng.random() < 0.4
+        degrees.append({
+            "id": university_id,
+            "university_id": university_id,
+            "offers_bachelors": four_year,
+            "offers_masters": masters,
+            "offers_doctorate": doctorate,
+            "offers_year_certificate": not four_year or rng.random() < 0.2,
+            "offers_post_bachelors_certificate": masters and rng.random() < 0.3,
+            "offers_post_masters_certificate": doctorate and rng.random() < 0.3,
+            "offers_post_doctorate_certificate": doctorate and rng.random() < 0.1,
+            "highest_degree": HIGHEST_DEGREES[3 if doctorate else 2 if masters else 1 if four_year else 0],
+        })
+    return universities, identities, degrees
+
+
+def swipe_rows(rng: random.Random, count: int, universities: int, now: datetime):
+    swipes, matches = [], []
+    for _ in range(count):
+        university_id = rng.randint(1, universities)
+        direction = "right" if rng.random() < 0.4 else "left"
+        timestamp = now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+        # Ids come from the database, so the API's own inserts don't collide with them
+        swipes.append({
+            "university_id": university_id,
+            "swipe_direction": direction,
+            "swipe_timestamp": timestamp,
+            "notes": None,
+        })
+        if direction == "right":
+            matches.append({"university_id": university_id, "match_timestamp": timestamp})
+    return swipes, matches
+
+
+def reset(connection):
+    # Children first, so foreign keys hold on Postgres
+    for table in reversed(api.Base.metadata.sorted_tables):
+        connection.execute(table.delete())
+    DATASET_MARKER.drop(connection, checkfirst=True)
+
+
+def is_generated(connection):
+    """True when generate() filled this database, so its swipes and images are benchmark data."""
+    if not inspect(connection).has_table(DATASET_MARKER.name):
+        return False
+    return connection.execute(select(func.count()).select_from(DATASET_MARKER)).scalar() > 0
+
+
+def reset_run_writes():
+    """
+    Deletes what benchmark runs add to a generated dataset: swipes and matches made
+    after DATASET_NOW and every cached image. Swipe counters are rebuilt to match.
+    Exits without deleting anything unless generate() filled the database.
+    Returns the number of rows deleted.
+    """
+    with api.engine.begin() as connection:
+        if not is_generated(connection):
+            sys.exit(
+                f"{api.engine.url.render_as_string(hide_password=True)} was not filled by bench.dataset; "
+                "refusing to delete its swipes and images"
+            )
+        deleted = sum(result.rowcount for result in (
+            connection.execute(delete(api.UniversityMatch).where(api.UniversityMatch.match_timestamp > DATASET_NOW)),
+            connection.execute(delete(api.UserSwipe).where(api.UserSwipe.swipe_timestamp > DATASET_NOW)),
+            connection.execute(delete(api.UniversityImage)),
+        ))
+    if deleted:
+        with api.SessionLocal() as db:
+            api.rebuild_swipe_stats(db)
+    return deleted
+
+
+def generate(rows: int, swipes: int, seed: int):
+    rng = random.Random(seed)
+    now = DATASET_NOW
+    started = time.perf_counter()
+    with api.engine.begin() as connection:
+        for start in range(1, rows + 1, BATCH_SIZE):
+            universities, identities, degrees = university_rows(rng, start, min(BATCH_SIZE, rows + 1 - start))
+            connection.execute(insert(api.University), universities)
+            connection.execute(insert(api.InstitutionIdentity), identities)
+            connection.execute(insert(api.DegreeOffering), degrees)
+            print(f"{start + len(universities) - 1}/{rows} universities ({time.perf_counter() - started:.1f}s)")
+        for start in range(1, swipes + 1, BATCH_SIZE):
+            swipe_batch, matches = swipe_rows(rng, min(BATCH_SIZE, swipes + 1 - start), rows, now)
+            connection.execute(insert(api.UserSwipe), swipe_batch)
+            if matches:
+                connection.execute(insert(api.UniversityMatch), matches)
+            print(f"{start + len(swipe_batch) - 1}/{swipes} swipes ({time.perf_counter() - started:.1f}s)")
+        DATASET_MARKER.create(connection, checkfirst=True)
+        connection.execute(delete(DATASET_MARKER))
+        connection.execute(insert(DATASET_MARKER), {"rows": rows, "swipes": swipes, "seed": seed, "generated_at": datetime.utcnow()})
+    # The swipes bypassed the API, so its swipe counters are rebuilt from them
+    with api.SessionLocal() as db:
+        api.rebuild_swipe_stats(db)
+    # Fresh statistics, so the planner sees the new table sizes
+    with api.engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    print(f"Generated {rows} universities and {swipes} swipes in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog for benchmarks")
+    parser.add_argument("--rows", type=int, default=10000, help="universities to generate (1k to 1M)")
+    parser.add_argument("--swipes", type=int, default=10000, help="swipes to generate")
+    parser.add_argument("--seed", type=int, default=1, help="random seed; the same seed gives the same data")
+    parser.add_argument("--reset", action="store_true", help="delete existing rows from every table first")
+    args = parser.parse_args()
+
+    api.create_schema()
+    with api.engine.begin() as connection:
+        if args.reset:
+            reset(connection)
+        elif connection.execute(select(func.count()).select_from(api.University)).scalar():
+            sys.exit("The database already has universities; pass --reset to replace them")
+    generate(args.rows, args.swipes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares GeoIndex with a brute-force haversine scan over every university: the
+same nearest-N and radius queries both ways, with latency percentiles and a
+check that both return the same universities.
+
+The catalog is generated in memory with bench.dataset's rows, so no database is needed.
+
+Usage: python -m bench.geo [--rows 100000] [--queries 200] [--limit 20] [--radius-km 50]
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+import api
+from bench.dataset import university_rows
+from bench.run import add_report_arguments, summarize, write_report
+
+
+def brute_force(index: api.GeoIndex, lat: float, lon: float, limit: int, radius_km: float = None):
+    """Ids of the nearest universities, from distances to all of them."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    a = np.sin((index.lat - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(index.lat) * np.sin((index.lon - lon1) / 2) ** 2
+    distances = 2 * api.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    positions = np.arange(len(distances))
+    if radius_km is not None:
+        positions = positions[distances <= radius_km]
+    order = np.lexsort((index.ids[positions], distances[positions]))
+    return [int(index.ids[position]) for position in positions[order][:limit]]
+
+
+def timed(fn, points: list):
+    samples, answers = [], []
+    for lat, lon in points:
+        start = time.perf_counter()
+        answers.append(fn(lat, lon))
+        samples.append((time.perf_counter() - start, True))
+    return summarize(samples), answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the geo index against a brute-force scan")
+    parser.add_argument("--rows", type=int, default=100000, help="universities in the generated catalog")
+    parser.add_argument("--queries", type=int, default=200, help="query points per scenario")
+    parser.add_argument("--limit", type=int, default=20, help="universities per query")
+    parser.add_argument("--radius-km", type=float, default=50, help="radius for the radius scenario")
+    add_report_arguments(parser, "random seed for the catalog and points")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows, _, _ = university_rows(rng, 1, args.rows)
+    started = time.perf_counter()
+    index = api.GeoIndex(rows)
+    build_seconds = time.perf_counter() - started
+    # Points over the same box as the generated coordinates
+    points = [(rng.uniform(25.0, 49.0), rng.uniform(-124.0, -67.0)) for _ in range(args.queries)]
+
+    scenarios = {
+        "nearest": (None,),
+        "radius": (args.radius_km,),
+    }
+    results = {}
+    for scenario, (radius_km,) in scenarios.items():
+        indexed, indexed_ids = timed(
+            lambda lat, lon: [row["id"] for row in index.nearest(lat, lon, args.limit, radius_km)], points
+        )
+        scanned, scanned_ids = timed(lambda lat, lon: brute_force(index, lat, lon, args.limit, radius_km), points)
+        results[scenario] = {
+            "index": indexed,
+            "brute_force": scanned,
+            "speedup_p50": round(scanned["p50_ms"] / indexed["p50_ms"], 1),
+            "mismatches": sum(1 for a, b in zip(indexed_ids, scanned_ids) if a != b),
+        }
+        print(f"{scenario}: index p50 {indexed['p50_ms']} ms, brute force p50 {scanned['p50_ms']} ms")
+
+    write_report({
+        "universities": args.rows,
+        "queries": args.queries,
+        "limit": args.limit,
+        "radius_km": args.radius_km,
+        "cell_degrees": index.cell_degrees,
+        "index_build_seconds": round(build_seconds, 3),
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
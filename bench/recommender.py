@@ -0,0 +1,64 @@
+"""
+Measures the recommender at several catalog sizes: the time to build the feature
+matrix and replay the swipe history, then the latency of scoring the deck, with a
+swipe recorded between requests as clients do.
+
+The catalogs are generated in memory with bench.dataset's rows, so no database is needed.
+
+Usage: python -m bench.recommender [--sizes 10000,50000,100000] [--swipes 5000] [--requests 200]
+"""
+import argparse
+import random
+import time
+
+import api
+from bench.dataset import university_rows
+from bench.run import add_report_arguments, summarize, write_report
+
+
+def catalog_rows(rng: random.Random, size: int):
+    # The columns load_recommendation_model selects, merged per university
+    universities, identities, degrees = university_rows(rng, 1, size)
+    return [{**university, **identity, **degree, "id": university["id"]}
+            for university, identity, degree in zip(universities, identities, degrees)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recommendation scoring at several catalog sizes")
+    parser.add_argument("--sizes", default="10000,50000,100000", help="comma-separated catalog sizes")
+    parser.add_argument("--swipes", type=int, default=5000, help="swipe history replayed into each model")
+    parser.add_argument("--requests", type=int, default=200, help="scored requests per size")
+    parser.add_argument("--limit", type=int, default=20, help="recommendations per request")
+    add_report_arguments(parser, "random seed for the catalog and swipes")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        rng = random.Random(args.seed)
+        catalog = catalog_rows(rng, size)
+        history = [(rng.randint(1, size), rng.choice(["left", "right"])) for _ in range(args.swipes)]
+
+        started = time.perf_counter()
+        model = api.RecommendationModel.from_catalog(catalog)
+        for university_id, direction in history:
+            model.record_swipe(university_id, direction)
+        build_seconds = time.perf_counter() - started
+
+        samples = []
+        for _ in range(args.requests):
+            model.record_swipe(rng.randint(1, size), rng.choice(["left", "right"]))
+            started = time.perf_counter()
+            model.recommend(args.limit)
+            samples.append((time.perf_counter() - started, True))
+        results.append({"universities": size, "build_seconds": round(build_seconds, 3), "recommend": summarize(samples)})
+        print(f"{size} universities: build {build_seconds:.2f}s, p50 {results[-1]['recommend']['p50_ms']} ms")
+
+    write_report({
+        "swipes": args.swipes,
+        "limit": args.limit,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Drives the API with a weighted mix of listing, detail, search, swipe, image and
+chart requests, and prints latency percentiles and throughput as JSON.
+
+By default the app runs in-process (httpx over ASGI, with its startup and
+shutdown handlers), and image lookups go to a local Wikipedia stub. With
+--base-url the same requests go to a running server instead; start it with
+WIKIPEDIA_API_URL and COMMONS_API_URL pointing at `python -m bench.wiki_stub`.
+
+The catalog is read from DATABASE_URL; fill it with `python -m bench.dataset` first.
+With --reset-writes, the swipes, matches and images written by earlier runs are
+deleted first (see bench.dataset.reset_run_writes), so every run starts from the
+same data. That only works on a database bench.dataset generated, and not with --base-url.
+
+Usage: python -m bench.run [--requests 2000] [--concurrency 8] [--warmup 200]
+                           [--mix listing=30,detail=25,...] [--reset-writes] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from bench.wiki_stub import WikiStub
+
+# Share of each kind of request in the mix
+DEFAULT_MIX = {
+    "listing": 30,
+    "detail": 20,
+    "degrees": 5,
+    "search": 15,
+    "swipe": 15,
+    "image": 5,
+    "chart": 5,
+    "matches": 5,
+}
+# Listing filters as the clients send them, as query strings
+LISTING_FILTERS = [
+    {},
+    {"states": "CA"},
+    {"states": "CO,CA,NY"},
+    {"sector": "Public, 4-year or above"},
+    {"states": "TX", "sector": "Public, 4-year or above"},
+    {"offers_doctorate": "true"},
+    {"states": "CA", "offers_masters": "true"},
+    {"is_hbcu": "true"},
+    {"religious_affiliation": "Roman Catholic"},
+    {"min_sat_math": "650", "max_sat_math": "800"},
+    {"states": "NY", "offers_bachelors": "true", "min_sat_math": "600"},
+]
+
+
+def parse_mix(value: str):
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def load_catalog(api):
+    """University ids and names to draw requests from."""
+    from sqlalchemy import select
+
+    with api.SessionLocal() as db:
+        rows = db.execute(select(api.University.id, api.University.name).order_by(api.University.id)).all()
+    if not rows:
+        sys.exit("No universities in the database; run python -m bench.dataset first")
+    return [row.id for row in rows], [row.name for row in rows if row.name]
+
+
+def plan_requests(rng: random.Random, mix: dict, count: int, ids: list, names: list):
+    """A reproducible list of (kind, method, url, json body) to send."""
+    kinds, weights = zip(*mix.items())
+
+    def university_id():
+        # Popular cards are requested more often than the long tail
+        return ids[int(len(ids) * rng.random() ** 2)]
+
+    plan = []
+    for kind in rng.choices(kinds, weights=weights, k=count):
+        if kind == "listing":
+            params = dict(rng.choice(LISTING_FILTERS), limit="50")
+            plan.append((kind, "GET", "/universities/", params, None))
+        elif kind == "detail":
+            plan.append((kind, "GET", f"/universities/{university_id()}", None, None))
+        elif kind == "degrees":
+            plan.append((kind, "GET", f"/universities/{university_id()}/degrees", None, None))
+        elif kind == "search":
+            # Whole names, single words and the prefixes typed on the way to them
+            words = rng.choice(names).split()
+            term = rng.choice([" ".join(words), rng.choice(words), rng.choice(words)[:4]])
+            plan.append((kind, "GET", f"/universities/search/{term}", {"limit": "20"}, None))
+        elif kind == "swipe":
+            body = {"university_id": university_id(), "swipe_direction": rng.choice(["left", "right"])}
+            plan.append((kind, "POST", "/swipes/", None, body))
+        elif kind == "image":
+            plan.append((kind, "GET", f"/universities/{university_id()}/image", None, None))
+        elif kind == "chart":
+            plan.append((kind, "GET", rng.choice(["/sunburst-chart/data", "/sunburst-chart"]), None, None))
+        elif kind == "matches":
+            plan.append((kind, "GET", "/matches", {"limit": "50"}, None))
+    return plan
+
+
+async def drive(client, plan: list, concurrency: int):
+    """Sends the plan from concurrency workers; returns {kind: [(seconds, ok)]} and the wall time."""
+    results = defaultdict(list)
+    pending = iter(plan)
+
+    async def worker():
+        for kind, method, url, params, body in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, params=params, json=body)
+                ok = response.status_code < 400
+            except Exception as e:
+                print(f"{method} {url} failed: {e}", file=sys.stderr)
+                ok = False
+            results[kind].append((time.perf_counter() - start, ok))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values: list, fraction: float):
+    # Nearest rank
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(samples: list):
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    return {
+        "count": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def add_report_arguments(parser: argparse.ArgumentParser, seed_help: str = "random seed for the request sequence"):
+    """The --seed and --output options every benchmark takes; pass seed_help=None for no --seed."""
+    if seed_help:
+        parser.add_argument("--seed", type=int, default=1, help=seed_help)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+
+
+def write_report(report: dict, path: str = None, directory: str = None):
+    """Prints the report as JSON, headed by the commit of directory (this checkout by default), and writes it to path too."""
+    output = json.dumps({"commit": git_commit(directory), **report}, indent=2)
+    print(output)
+    if path:
+        with open(path, "w") as f:
+            f.write(output + "\n")
+
+
+def git_commit(directory: str = None):
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=directory or os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, api, plan: list, warmup: list):
+    import httpx
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench", timeout=60)
+        await api.app.router.startup()
+    try:
+        async with client:
+            await drive(client, warmup, args.concurrency)
+            return await drive(client, plan, args.concurrency)
+    finally:
+        if not args.base_url:
+            await api.app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API with a realistic request mix")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=200, help="requests sent first and not measured")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="weights, e.g. listing=30,detail=25,swipe=10")
+    parser.add_argument("--wiki-latency", type=float, default=0.05, help="seconds the Wikipedia stub takes per call")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--reset-writes", action="store_true",
+                        help="first delete the swipes, matches and images earlier runs wrote to the generated dataset")
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    if args.reset_writes and args.base_url:
+        # The local database is not the one behind a remote server
+        parser.error("--reset-writes only applies to the in-process app, not --base-url")
+
+    with WikiStub(latency=args.wiki_latency) as stub:
+        # Always the stub, even if the environment names the real Wikipedia. api reads
+        # the endpoints at import; they are set on the module too in case it was imported already.
+        os.environ["WIKIPEDIA_API_URL"] = stub.url
+        os.environ["COMMONS_API_URL"] = stub.url
+        import api
+
+        api.WIKIPEDIA_API_URL = api.COMMONS_API_URL = stub.url
+        if not args.base_url:
+            api.create_schema()
+        if args.reset_writes:
+            from bench.dataset import reset_run_writes
+
+            # Starting from the generated data, runs on different commits compare
+            deleted = reset_run_writes()
+            print(f"Deleted {deleted} swipes, matches and images left by earlier runs", file=sys.stderr)
+        ids, names = load_catalog(api)
+        rng = random.Random(args.seed)
+        warmup = plan_requests(rng, args.mix, args.warmup, ids, names)
+        plan = plan_requests(rng, args.mix, args.requests, ids, names)
+        results, elapsed = asyncio.run(run(args, api, plan, warmup))
+
+    samples = [sample for kind_samples in results.values() for sample in kind_samples]
+    write_report({
+        "target": args.base_url or "in-process",
+        "database": api.engine.dialect.name,
+        "universities": len(ids),
+        "requests": len(samples),
+        "concurrency": args.concurrency,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "overall": summarize(samples),
+        "by_kind": {kind: summarize(kind_samples) for kind, kind_samples in sorted(results.items())},
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
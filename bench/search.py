@@ -0,0 +1,83 @@
+"""
+Compares the name search index with the ILIKE scan it replaced: builds the index
+over the catalog in DATABASE_URL, then times the same search terms both ways and
+prints latency percentiles as JSON.
+
+The terms are drawn like bench.run's searches: whole names, single words and the
+prefixes typed on the way to them. For numbers comparable to the endpoint's, fill
+the catalog with about 100k rows first:
+
+    python -m bench.dataset --rows 100000 --reset
+    python -m bench.search --queries 200
+
+Usage: python -m bench.search [--queries 200] [--limit 50] [--seed 1] [--output search.json]
+"""
+import argparse
+import random
+import time
+
+import api
+from bench.run import add_report_arguments, load_catalog, summarize, write_report
+
+
+def search_terms(rng: random.Random, names: list, count: int):
+    terms = []
+    for _ in range(count):
+        words = rng.choice(names).split()
+        terms.append(rng.choice([" ".join(words), rng.choice(words), rng.choice(words)[:4]]))
+    return terms
+
+
+def ilike_search(db, term: str, limit: int = None):
+    # The query /universities/search/{name} ran before the index
+    query = api.university_select(api.UNIVERSITY_SUMMARY_COLUMNS).where(api.University.name.ilike(f"%{term}%"))
+    if limit is not None:
+        query = query.limit(limit)
+    return db.execute(query).all()
+
+
+def timed(fn, terms: list):
+    samples, results = [], 0
+    for term in terms:
+        start = time.perf_counter()
+        results += len(fn(term))
+        samples.append((time.perf_counter() - start, True))
+    return summarize(samples), results / len(terms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the name search index against ILIKE")
+    parser.add_argument("--queries", type=int, default=200, help="search terms to time")
+    parser.add_argument("--limit", type=int, default=50, help="results per search, as the endpoint's limit")
+    add_report_arguments(parser, "random seed for the search terms")
+    args = parser.parse_args()
+
+    ids, names = load_catalog(api)
+    terms = search_terms(random.Random(args.seed), names, args.queries)
+
+    with api.SessionLocal() as db:
+        rows = [api.university_row_to_dict(row) for row in db.execute(
+            api.university_select(api.UNIVERSITY_SUMMARY_COLUMNS).order_by(api.University.id)
+        )]
+        started = time.perf_counter()
+        index = api.NameSearchIndex(rows)
+        build_seconds = time.perf_counter() - started
+
+        ilike, ilike_results = timed(lambda term: ilike_search(db, term), terms)
+        ilike_limited, ilike_limited_results = timed(lambda term: ilike_search(db, term, args.limit), terms)
+    indexed, indexed_results = timed(lambda term: index.search(term, args.limit), terms)
+
+    write_report({
+        "database": api.engine.dialect.name,
+        "universities": len(ids),
+        "queries": len(terms),
+        "limit": args.limit,
+        "index_build_seconds": round(build_seconds, 3),
+        "ilike": dict(ilike, mean_results=round(ilike_results, 1)),
+        "ilike_limited": dict(ilike_limited, mean_results=round(ilike_limited_results, 1)),
+        "index": dict(indexed, mean_results=round(indexed_results, 1)),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
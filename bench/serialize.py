@@ -0,0 +1,72 @@
+"""
+Times encoding a listing response of 100 and 5000 rows, the ways the API has
+done it:
+
+- fastapi: jsonable_encoder and json.dumps, as a List[dict] response model did
+- orjson: orjson.dumps of the whole list
+- fragments_cold / fragments_warm: encode_university_rows with no encoded
+  fragments yet, and with every row's fragment already cached
+
+The rows are listing rows read from DATABASE_URL.
+
+Usage: python -m bench.serialize [--sizes 100,5000] [--repeat 20] [--output serialize.json]
+"""
+import argparse
+import json
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+import api
+from bench.run import add_report_arguments, summarize, write_report
+
+
+def timed(fn, repeat: int, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start, True))
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark listing response encoding")
+    parser.add_argument("--sizes", default="100,5000", help="comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=20, help="encodings timed per way and size")
+    add_report_arguments(parser, seed_help=None)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    with api.SessionLocal() as db:
+        rows = [api.university_row_to_dict(row) for row in db.execute(
+            api.university_select().order_by(api.University.id).limit(max(sizes))
+        )]
+    if len(rows) < max(sizes):
+        raise SystemExit(f"Only {len(rows)} universities in the database; run python -m bench.dataset first")
+
+    def drop_fragments():
+        api.catalog_cache.invalidate(lambda key: key[0] == "fragments")
+
+    results = {}
+    for size in sizes:
+        page = rows[:size]
+        results[size] = {
+            "fastapi": timed(lambda: json.dumps(jsonable_encoder(page)).encode(), args.repeat),
+            "orjson": timed(lambda: orjson.dumps(page), args.repeat),
+            "fragments_cold": timed(lambda: api.encode_university_rows(page, "listing"), args.repeat, drop_fragments),
+            "fragments_warm": timed(lambda: api.encode_university_rows(page, "listing"), args.repeat),
+        }
+        print(f"{size} rows: " + ", ".join(f"{way} {result['p50_ms']} ms" for way, result in results[size].items()))
+
+    write_report({
+        "repeat": args.repeat,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
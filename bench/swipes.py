@@ -0,0 +1,112 @@
+"""
+Measures swipe ingestion in inserts per second, three ways:
+
+- single: one transaction per swipe, as POST /swipes/ wrote them before the buffer
+- buffered: SwipeBuffer, fed from several threads like concurrent requests
+- batch: insert_swipes in chunks, as POST /swipes/batch writes them
+
+The swipes it writes are deleted afterwards and the swipe counters rebuilt, so
+the database is left as it was.
+
+Usage: python -m bench.swipes [--swipes 5000] [--threads 8] [--batch-size 500] [--output swipes.json]
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+import api
+from bench.run import add_report_arguments, load_catalog, write_report
+
+
+def make_swipes(rng: random.Random, ids: list, count: int):
+    return [{
+        "university_id": rng.choice(ids),
+        "swipe_direction": "right" if rng.random() < 0.4 else "left",
+        "notes": None,
+        "swipe_timestamp": datetime.utcnow(),
+    } for _ in range(count)]
+
+
+def single(swipes: list):
+    for swipe in swipes:
+        with api.SessionLocal() as db:
+            api.insert_swipes(db, [swipe])
+
+
+def buffered(swipes: list, threads: int):
+    buffer = api.SwipeBuffer(api.SWIPE_FLUSH_INTERVAL, api.SWIPE_FLUSH_SIZE)
+    buffer.start()
+
+    def feed(share):
+        for swipe in share:
+            buffer.add(swipe)
+
+    feeders = [threading.Thread(target=feed, args=(swipes[i::threads],)) for i in range(threads)]
+    for feeder in feeders:
+        feeder.start()
+    for feeder in feeders:
+        feeder.join()
+    # Timed until the last swipe is stored
+    buffer.stop()
+
+
+def batch(swipes: list, size: int):
+    for start in range(0, len(swipes), size):
+        with api.SessionLocal() as db:
+            api.insert_swipes(db, swipes[start:start + size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark swipe inserts per second")
+    parser.add_argument("--swipes", type=int, default=5000, help="swipes written per mode")
+    parser.add_argument("--threads", type=int, default=8, help="threads adding to the buffer")
+    parser.add_argument("--batch-size", type=int, default=500, help="swipes per insert in batch mode")
+    add_report_arguments(parser, "random seed for the swipes")
+    args = parser.parse_args()
+
+    api.create_schema()
+    ids, _ = load_catalog(api)
+    rng = random.Random(args.seed)
+    modes = {
+        "single": lambda swipes: single(swipes),
+        "buffered": lambda swipes: buffered(swipes, args.threads),
+        "batch": lambda swipes: batch(swipes, args.batch_size),
+    }
+
+    with api.SessionLocal() as db:
+        last_swipe = db.execute(select(func.coalesce(func.max(api.UserSwipe.id), 0))).scalar()
+        last_match = db.execute(select(func.coalesce(func.max(api.UniversityMatch.id), 0))).scalar()
+    results = {}
+    try:
+        for mode, write in modes.items():
+            swipes = make_swipes(rng, ids, args.swipes)
+            started = time.perf_counter()
+            write(swipes)
+            elapsed = time.perf_counter() - started
+            results[mode] = {"seconds": round(elapsed, 3), "inserts_per_second": round(len(swipes) / elapsed, 1)}
+            print(f"{mode}: {results[mode]['inserts_per_second']} swipes/s")
+    finally:
+        # Leave the history and its counters as they were
+        with api.SessionLocal() as db:
+            db.execute(delete(api.UniversityMatch).where(api.UniversityMatch.id > last_match))
+            db.execute(delete(api.UserSwipe).where(api.UserSwipe.id > last_swipe))
+            db.commit()
+            api.rebuild_swipe_stats(db)
+
+    write_report({
+        "database": api.engine.dialect.name,
+        "swipes": args.swipes,
+        "threads": args.threads,
+        "batch_size": args.batch_size,
+        "flush_size": api.SWIPE_FLUSH_SIZE,
+        "flush_interval": api.SWIPE_FLUSH_INTERVAL,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+A local stand-in for the Wikipedia and Commons APIs, answering the queries the
+image endpoint makes with small deterministic payloads after a fixed delay.
+
+bench.run starts one itself. To benchmark a separate server, run it standalone
+and start the API with WIKIPEDIA_API_URL and COMMONS_API_URL set to its URL.
+
+Usage: python -m bench.wiki_stub [--port 8089] [--latency 0.05]
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def page_id(name: str):
+    return zlib.crc32(name.encode()) % 1000000 + 1
+
+
+def respond(params: dict):
+    """The JSON body for one Wikipedia API query."""
+    if params.get("list") == "search":
+        name = params.get("srsearch", "")
+        return {"query": {"search": [{"pageid": page_id(name), "title": name}]}}
+    if params.get("list") == "categorymembers":
+        return {"query": {"categorymembers": [{"title": "File:Campus Quad.jpg"}, {"title": "File:Seal.svg"}]}}
+    if params.get("generator") == "search":
+        return {"query": {"pages": {"1": {"images": [{"title": "File:Library building.jpg"}]}}}}
+    if params.get("prop") == "images":
+        pid = params.get("pageids", "0")
+        images = [{"title": "File:Main Hall campus.jpg"}, {"title": "File:Logo.png"}, {"title": "File:Stadium.JPG"}]
+        return {"query": {"pages": {pid: {"pageid": int(pid), "images": images}}}}
+    if params.get("prop") == "imageinfo":
+        pages = {}
+        for position, title in enumerate(params.get("titles", "").split("|")):
+            pages[str(-position - 1)] = {
+                "title": title,
+                "imageinfo": [{
+                    "url": f"https://upload.example.org/{title.split(':')[-1].replace(' ', '_')}",
+                    "extmetadata": {"ObjectName": {"value": title}},
+                }],
+            }
+        return {"query": {"pages": pages}}
+    return {"query": {}}
+
+
+class WikiStub:
+    """Serves the stub on 127.0.0.1 from a background thread; url is the API endpoint."""
+
+    def __init__(self, latency: float = 0.05, port: int = 0):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+                time.sleep(stub.latency)
+                body = json.dumps(respond(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.latency = latency
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/w/api.php"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stub of the Wikipedia API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    with WikiStub(latency=args.latency, port=args.port) as stub:
+        print(f"Serving the Wikipedia stub at {stub.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
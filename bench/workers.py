@@ -0,0 +1,124 @@
+"""
+Measures how throughput scales with worker processes: starts `python api.py serve`
+at each worker count, sends it the seeded request mix from bench.run, and prints
+the results as JSON.
+
+The load generator is a single process, so give it enough --concurrency to keep
+every worker busy; if throughput stops scaling, check that it isn't the client
+that is saturated.
+
+With --reset-writes, each worker count starts from the generated data, as in bench.run.
+
+Usage: python -m bench.workers [--workers 1,2,4] [--requests 2000] [--concurrency 32] [--reset-writes]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from bench.run import DEFAULT_MIX, add_report_arguments, drive, load_catalog, parse_mix, plan_requests, summarize, write_report
+from bench.wiki_stub import WikiStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(process: subprocess.Popen, base_url: str, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"The server exited with code {process.returncode}")
+        try:
+            httpx.get(base_url + "/", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    sys.exit("The server did not start in time")
+
+
+async def measure(base_url: str, plan: list, warmup: list, concurrency: int):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        await drive(client, warmup, concurrency)
+        return await drive(client, plan, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API at several worker counts")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per worker count")
+    parser.add_argument("--warmup", type=int, default=200, help="requests sent first and not measured")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at once")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="weights, e.g. listing=30,detail=25,swipe=10")
+    parser.add_argument("--wiki-latency", type=float, default=0.05, help="seconds the Wikipedia stub takes per call")
+    parser.add_argument("--reset-writes", action="store_true",
+                        help="delete the swipes, matches and images runs wrote to the generated dataset before each worker count")
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    with WikiStub(latency=args.wiki_latency) as stub:
+        # The servers inherit the environment, so they use the stub and the same database
+        os.environ["WIKIPEDIA_API_URL"] = stub.url
+        os.environ["COMMONS_API_URL"] = stub.url
+        import api
+        from bench.dataset import reset_run_writes
+
+        api.create_schema()
+        ids, names = load_catalog(api)
+        results = []
+        for workers in [int(count) for count in args.workers.split(",")]:
+            if args.reset_writes:
+                # Each worker count starts from the generated data
+                reset_run_writes()
+            # The same requests at every worker count
+            rng = random.Random(args.seed)
+            warmup = plan_requests(rng, args.mix, args.warmup, ids, names)
+            plan = plan_requests(rng, args.mix, args.requests, ids, names)
+
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            process = subprocess.Popen(
+                [sys.executable, "api.py", "serve", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+                cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_until_ready(process, base_url)
+                samples_by_kind, elapsed = asyncio.run(measure(base_url, plan, warmup, args.concurrency))
+            finally:
+                process.terminate()
+                process.wait()
+
+            samples = [sample for kind_samples in samples_by_kind.values() for sample in kind_samples]
+            results.append({
+                "workers": workers,
+                "duration_seconds": round(elapsed, 3),
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                "overall": summarize(samples),
+            })
+            print(f"{workers} workers: {results[-1]['throughput_rps']} requests/s", file=sys.stderr)
+
+    write_report({
+        "database": api.engine.dialect.name,
+        "universities": len(ids),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Runs EXPLAIN on the catalog queries for each common filter combination and
+fails if any plan falls back to a full scan of a large table.
+
+Needs Postgres, pointed at a database holding a realistic or larger catalog;
+on a few hundred rows the planner is right to prefer sequential scans.
+
+Usage: python check_query_plans.py [--min-rows 10000] [--analyze]
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import select, text
+
+import api
+
+# Listing filters the clients actually send, alone and combined
+FILTER_COMBINATIONS = [
+    ("unfiltered", {}),
+    ("one state", {"states": "CO"}),
+    ("several states", {"states": "CO,CA,NY"}),
+    ("sector", {"sector": "Public, 4-year or above"}),
+    ("state and sector", {"states": "TX", "sector": "Public, 4-year or above"}),
+    ("doctorate", {"offers_doctorate": True}),
+    ("state and masters", {"states": "CA", "offers_masters": True}),
+    ("hbcu", {"is_hbcu": True}),
+    ("tribal", {"is_tribal": True}),
+    ("religious affiliation", {"religious_affiliation": "Roman Catholic"}),
+    ("control", {"control_of_institution": "Private not-for-profit"}),
+    ("sat math range", {"min_sat_math": 650, "max_sat_math": 800}),
+    ("act composite range", {"min_act_composite": 30}),
+    ("state, bachelors and sat", {"states": "NY", "offers_bachelors": True, "min_sat_math": 600}),
+]
+
+
+def catalog_statements():
+    for name, params in FILTER_COMBINATIONS:
+        query = api.UniversityFilters(**params).apply(api.university_select())
+        yield f"listing: {name}", query.order_by(api.University.id).limit(100)
+
+    yield "card lookup", (
+        select(api.University, api.InstitutionIdentity, api.DegreeOffering)
+        .outerjoin(api.InstitutionIdentity, api.InstitutionIdentity.university_id == api.University.id)
+        .outerjoin(api.DegreeOffering, api.DegreeOffering.university_id == api.University.id)
+        .where(api.University.id == 1)
+        .limit(1)
+    )
+    yield "degrees lookup", select(api.DegreeOffering).where(api.DegreeOffering.university_id == 1)
+    yield "matches page", (
+        select(api.UniversityMatch)
+        .order_by(api.UniversityMatch.match_timestamp.desc(), api.UniversityMatch.id.desc())
+        .limit(100)
+    )
+    yield "swipes for university", select(api.UserSwipe).where(api.UserSwipe.university_id == 1)
+
+
+def full_scans(connection, sql):
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    tables = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            tables.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return tables
+
+
+def table_rows(connection, table: str):
+    # The planner's estimate is what it works from, and avoids counting large tables
+    return connection.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar() or 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check catalog query plans for full table scans")
+    parser.add_argument("--min-rows", type=int, default=10000, help="tables smaller than this may be scanned")
+    parser.add_argument("--analyze", action="store_true", help="refresh planner statistics first")
+    args = parser.parse_args()
+
+    with api.engine.connect() as connection:
+        if connection.dialect.name != "postgresql":
+            sys.exit(f"EXPLAIN checks need Postgres, not {connection.dialect.name}")
+
+        if args.analyze:
+            connection.execute(text("ANALYZE"))
+
+        failures = 0
+        for name, statement in catalog_statements():
+            sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+            large = [
+                table for table in full_scans(connection, sql)
+                if table_rows(connection, table) >= args.min_rows
+            ]
+            if large:
+                failures += 1
+                print(f"FAIL  {name}: full scan of {', '.join(sorted(set(large)))}")
+            else:
+                print(f"ok    {name}")
+
+    if failures:
+        sys.exit(f"{failures} queries fall back to full table scans")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Resolves campus images for every university ahead of time, so the API serves
+/universities/{id}/image from the university_images table without calling Wikipedia.
+
+Universities whose cached image is still fresh are skipped, so an interrupted
+run picks up where it left off.
+
+Usage: python prefetch_images.py [--concurrency 4] [--rate 10] [--force] [--limit N]
+"""
+import argparse
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import api
+
+
+def pending_universities(force: bool, limit: int = None):
+    db = api.SessionLocal()
+    try:
+        query = (
+            db.query(api.University.id, api.University.name, api.UniversityImage)
+            .outerjoin(api.UniversityImage, api.UniversityImage.university_id == api.University.id)
+            .filter(api.University.name.isnot(None))
+            .order_by(api.University.id)
+        )
+        pending = [
+            (university_id, name) for university_id, name, image in query.all()
+            if force or image is None or not api.image_is_fresh(image)
+        ]
+        return pending[:limit] if limit else pending
+    finally:
+        db.close()
+
+
+class Progress:
+    def __init__(self, total: int, every: int):
+        self.total = total
+        self.every = every
+        self.counts = {"found": 0, "empty": 0, "errors": 0}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+            done = sum(self.counts.values())
+            if done % self.every == 0 or done == self.total:
+                self.report(done)
+
+    def report(self, done: int):
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed else 0.0
+        print(
+            f"{done}/{self.total} universities, {rate:.2f}/s "
+            f"(found {self.counts['found']}, empty {self.counts['empty']}, errors {self.counts['errors']})"
+        )
+
+
+def prefetch_one(university_id: int, name: str, progress: Progress):
+    try:
+        result = api.resolve_university_image(name)
+    except requests.exceptions.RequestException as e:
+        # Left uncached so the next run retries it
+        print(f"Error making request to Wikipedia for {name}: {e}")
+        progress.record("errors")
+        return
+    except Exception as e:
+        print(f"Unexpected error for {name}: {e}")
+        progress.record("errors")
+        return
+
+    db = api.SessionLocal()
+    try:
+        api.store_university_image(db, university_id, result)
+    except Exception as e:
+        db.rollback()
+        print(f"Error storing the image for {name}: {e}")
+        progress.record("errors")
+        return
+    finally:
+        db.close()
+    progress.record("found" if result["image_url"] else "empty")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch campus images for every university")
+    parser.add_argument("--concurrency", type=int, default=4, help="universities resolved at once")
+    parser.add_argument("--rate", type=float, default=10.0, help="max Wikipedia requests per second, 0 for no limit")
+    parser.add_argument("--force", action="store_true", help="refresh images that are still fresh")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many universities")
+    parser.add_argument("--report-every", type=int, default=25, help="print progress every N universities")
+    args = parser.parse_args(argv)
+    if args.rate < 0:
+        parser.error("--rate must be 0 or more")
+
+    api.create_schema()
+    api.wiki_rate_limiter = api.RateLimiter(args.rate) if args.rate else None
+
+    pending = pending_universities(args.force, args.limit)
+    print(f"{len(pending)} universities to resolve")
+    progress = Progress(len(pending), args.report_every)
+    if not pending:
+        return progress
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(prefetch_one, university_id, name, progress) for university_id, name in pending]
+        # prefetch_one records its own errors; anything that escapes it is still counted
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Unexpected error: {e}")
+                progress.record("errors")
+    return progress
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Shared fixtures: the API runs against a throwaway SQLite database seeded with a
+small catalog, so the suite needs no Postgres. Run with `python -m pytest`.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_DIR = tempfile.mkdtemp(prefix="universities-tests-")
+
+# api reads its settings at import, so they are set first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIR, 'api.db')}"
+os.environ["SWIPE_WRITE_BEHIND"] = "0"
+os.environ["WIKIPEDIA_API_URL"] = "http://127.0.0.1:9/w/api.php"
+os.environ["COMMONS_API_URL"] = "http://127.0.0.1:9/w/api.php"
+sys.path.insert(0, ROOT)
+
+import api  # noqa: E402
+
+STATES = ["CO", "CA", "NY", "TX"]
+UNIVERSITIES = 60
+
+
+def seed(db, count: int):
+    for i in range(1, count + 1):
+        db.add(api.University(
+            id=i, name=f"University {i} of {STATES[i % 4]}", state=STATES[i % 4],
+            sector="Public" if i % 2 else "Private", latitude=30 + i * 0.1, longitude=-100 + i * 0.1,
+            sat_math_25=400 + i, sat_math_75=600 + i, act_composite_25=18, act_composite_75=30,
+            description="d", website="w",
+        ))
+        db.add(api.InstitutionIdentity(
+            id=i, university_id=i, is_hbcu=i % 7 == 0, is_tribal=False, religious_affiliation=None,
+            carnegie_classification="c", control_of_institution="Public" if i % 2 else "Private",
+        ))
+        db.add(api.DegreeOffering(
+            id=i, university_id=i, offers_bachelors=True, offers_masters=i % 3 == 0, offers_doctorate=i % 5 == 0,
+            highest_degree="Doctor's" if i % 5 == 0 else "Bachelor's",
+        ))
+    db.commit()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    api.create_schema()
+    with api.SessionLocal() as db:
+        seed(db, UNIVERSITIES)
+    # Entering the client runs the startup and shutdown handlers
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    api.catalog_cache.invalidate()
+    yield
+
+
+@pytest.fixture
+def statements():
+    """The SQL statements executed while the test runs, on any engine."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", record)
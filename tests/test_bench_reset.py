@@ -0,0 +1,54 @@
+"""
+bench.run --reset-writes deletes swipes and images, so it must only touch a
+database that bench.dataset generated.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import func, select
+
+import api
+from bench.dataset import reset_run_writes
+from conftest import ROOT
+
+
+def test_reset_refuses_a_database_bench_did_not_generate(client):
+    client.post("/swipes/", json={"university_id": 30, "swipe_direction": "right"})
+    with api.SessionLocal() as db:
+        before = db.execute(select(func.count()).select_from(api.UserSwipe)).scalar()
+    with pytest.raises(SystemExit, match="refusing"):
+        reset_run_writes()
+    with api.SessionLocal() as db:
+        assert db.execute(select(func.count()).select_from(api.UserSwipe)).scalar() == before
+
+
+def test_reset_deletes_run_writes_from_a_generated_database(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'bench.db'}")
+
+    def run(*args):
+        result = subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    run("-m", "bench.dataset", "--rows", "50", "--swipes", "40")
+    output = run("-c", """
+import api
+from datetime import datetime
+from bench.dataset import reset_run_writes
+with api.SessionLocal() as db:
+    api.insert_swipes(db, [{"university_id": 1, "swipe_direction": "right", "notes": None, "swipe_timestamp": datetime.utcnow()}])
+print(reset_run_writes(), reset_run_writes())
+""")
+    # The swipe and its match, then nothing left to delete
+    assert output.split() == ["2", "0"]
+
+
+def test_reset_is_refused_with_a_base_url():
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.run", "--reset-writes", "--base-url", "http://127.0.0.1:9"],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 2
+    assert "--base-url" in result.stderr
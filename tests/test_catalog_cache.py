@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import api
+
+
+def test_concurrent_misses_run_one_loader():
+    cache = api.CatalogCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(("k",), loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ["value"] * 8
+    assert cache.stats()["misses"] == 1
+
+
+def test_loader_error_reaches_waiters_and_is_not_cached():
+    cache = api.CatalogCache()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_load(("k",), failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=call)
+    first.start()
+    started.wait()
+    second = threading.Thread(target=call)
+    second.start()
+    first.join()
+    second.join()
+    assert len(errors) == 2
+    assert cache.get_or_load(("k",), lambda: "loaded") == "loaded"
+
+
+def test_async_concurrent_misses_run_one_loader():
+    cache = api.CatalogCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load(("k",), loader) for _ in range(20)))
+
+    assert asyncio.run(main()) == ["value"] * 20
+    assert len(calls) == 1
+
+
+def test_async_waiters_reload_when_loading_request_is_cancelled():
+    cache = api.CatalogCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_load(("k",), loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.aget_or_load(("k",), loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+
+
+def test_load_invalidated_midway_is_not_stored():
+    cache = api.CatalogCache()
+
+    def loader():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_load(("k",), loader) == "stale"
+    assert cache.peek(("k",)) is None
+
+
+def test_encoded_fragments_are_not_counted(client):
+    before = api.catalog_cache.stats()
+    client.get("/universities/", params={"states": "TX"})
+    client.get("/universities/", params={"states": "TX"})
+    after = api.catalog_cache.stats()
+    # One miss for the page, one hit when it is served again
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
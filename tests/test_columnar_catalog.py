@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def memory_engine(client, monkeypatch):
+    monkeypatch.setattr(api, "CATALOG_FILTER_ENGINE", "memory")
+    builds = []
+    build = api.ColumnarCatalog
+
+    def counting_build(rows, degrees):
+        builds.append(len(rows))
+        return build(rows, degrees)
+
+    monkeypatch.setattr(api, "ColumnarCatalog", counting_build)
+    return builds
+
+
+def test_concurrent_cold_requests_build_once(client, memory_engine):
+    statuses = []
+    requests = [
+        threading.Thread(target=lambda state=state: statuses.append(
+            client.get("/universities/", params={"states": state}).status_code
+        ))
+        for state in ["CO", "CA", "NY", "TX"] * 4
+    ]
+    for request in requests:
+        request.start()
+    for request in requests:
+        request.join()
+    assert statuses == [200] * 16
+    assert memory_engine == [60]
+
+
+def test_memory_engine_matches_sql(client, memory_engine, monkeypatch):
+    params = {"states": "CO,NY", "offers_masters": "true", "limit": 5}
+    memory = client.get("/universities/", params=params)
+    api.catalog_cache.invalidate()
+    monkeypatch.setattr(api, "CATALOG_FILTER_ENGINE", "sql")
+    sql = client.get("/universities/", params=params)
+    assert memory.json() == sql.json()
+    assert memory.headers["X-Next-Cursor"] == sql.headers["X-Next-Cursor"]
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+import api
+
+ORIGIN = {"Origin": "https://app.example.org"}
+
+
+@pytest.fixture
+def cached_image(client):
+    with api.SessionLocal() as db:
+        api.store_university_image(db, 7, {
+            "image_url": "https://upload.example.org/Main_Hall.jpg",
+            "alt_text": "Campus of University 7",
+            "attribution": "Image from Wikipedia",
+        })
+
+
+def revalidate(client, path, params=None):
+    first = client.get(path, params=params, headers=ORIGIN)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    second = client.get(path, params=params, headers={**ORIGIN, "If-None-Match": etag})
+    return first, second
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/universities/", {"limit": 10}),
+    ("/universities/", {"limit": 10, "states": "CA", "offers_masters": "true"}),
+    ("/universities/3", None),
+    ("/universities/states", None),
+    ("/universities/search/University", {"limit": 5}),
+    ("/universities/3/degrees", None),
+])
+def test_matching_etag_gets_empty_304(client, path, params):
+    first, second = revalidate(client, path, params)
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["Cache-Control"] == api.CATALOG_CACHE_CONTROL
+    assert second.headers["Access-Control-Allow-Origin"] == first.headers["Access-Control-Allow-Origin"]
+    assert "content-type" not in second.headers
+
+
+def test_304_keeps_the_next_cursor(client):
+    first, second = revalidate(client, "/universities/", {"limit": 10})
+    assert second.status_code == 304
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+
+def test_image_304_by_etag_and_by_date(client, cached_image):
+    first, second = revalidate(client, "/universities/7/image")
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["Cache-Control"] == api.IMAGE_CACHE_CONTROL
+    assert second.headers["Last-Modified"] == first.headers["Last-Modified"]
+    assert second.headers["Access-Control-Allow-Origin"]
+
+    by_date = client.get("/universities/7/image", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert by_date.status_code == 304
+    stale = client.get("/universities/7/image", headers={"If-Modified-Since": api.http_date(datetime(2000, 1, 1))})
+    assert stale.status_code == 200
+
+
+def test_changed_etag_gets_full_response(client):
+    response = client.get("/universities/3", headers={"If-None-Match": '"not-the-current-tag"'})
+    assert response.status_code == 200
+    assert response.json()["university"]["id"] == 3
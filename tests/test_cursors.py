@@ -0,0 +1,73 @@
+import base64
+import json
+
+import pytest
+
+import api
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor({"id": 1}),
+    raw_cursor([1, 2]),
+    api.encode_cursor("abc"),
+    api.encode_cursor(1.5),
+    api.encode_cursor(True),
+    api.encode_cursor(2**63),
+    raw_cursor([[1]]),
+])
+def test_listing_rejects_malformed_cursor(client, cursor):
+    response = client.get("/universities/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("cursor", [
+    api.encode_cursor(5, 1),
+    api.encode_cursor("notadate", 1),
+    api.encode_cursor("2024-01-01T00:00:00", "1"),
+    api.encode_cursor("2024-01-01T00:00:00"),
+])
+def test_matches_rejects_malformed_cursor(client, cursor):
+    response = client.get("/matches", params={"cursor": cursor, "limit": 10})
+    assert response.status_code == 400
+
+
+def test_listing_cursor_pages_through_catalog(client):
+    seen, cursor = [], None
+    while True:
+        response = client.get("/universities/", params={"limit": 25, **({"cursor": cursor} if cursor else {})})
+        seen += [row["id"] for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == list(range(1, 61))
+
+
+def test_matches_cursor_round_trips(client):
+    client.post("/swipes/batch", json=[{"university_id": i, "swipe_direction": "right"} for i in (1, 2, 3)])
+    first = client.get("/matches", params={"limit": 2})
+    assert first.status_code == 200
+    rest = client.get("/matches", params={"limit": 100, "cursor": first.headers["X-Next-Cursor"]})
+    assert rest.status_code == 200
+    ids = [match["id"] for match in first.json() + rest.json()]
+    assert len(ids) == len(set(ids))
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": -1}, {"limit": 1001}, {"skip": -1}])
+def test_listing_rejects_out_of_range_page(client, params):
+    assert client.get("/universities/", params=params).status_code == 422
+
+
+def test_memory_listing_rejects_out_of_range_limit(client, monkeypatch):
+    monkeypatch.setattr(api, "CATALOG_FILTER_ENGINE", "memory")
+    assert client.get("/universities/", params={"limit": 0}).status_code == 422
+
+
+@pytest.mark.parametrize("limit", [0, -1, 1001])
+def test_matches_rejects_out_of_range_limit(client, limit):
+    assert client.get("/matches", params={"limit": limit}).status_code == 422
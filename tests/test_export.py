@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import sys
+
+import pytest
+
+import api
+
+FILTERS = [
+    {},
+    {"states": "CO,CA"},
+    {"offers_masters": "true", "is_hbcu": "false"},
+    {"min_sat_math": "430", "max_sat_math": "640"},
+]
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Several batches even on the small test catalog
+    monkeypatch.setattr(api, "EXPORT_BATCH_SIZE", 7)
+
+
+def listing(client, params):
+    return client.get("/universities/", params={**params, "limit": 1000}).json()
+
+
+def csv_value(value):
+    return "" if value is None else str(value)
+
+
+@pytest.mark.parametrize("params", FILTERS)
+def test_ndjson_export_matches_the_listing(client, params):
+    response = client.get("/universities/export", params={**params, "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == listing(client, params)
+
+
+@pytest.mark.parametrize("params", FILTERS)
+def test_csv_export_matches_the_listing(client, params):
+    response = client.get("/universities/export", params={**params, "format": "csv"})
+    assert response.status_code == 200
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == [column.key for column in api.UNIVERSITY_COLUMNS]
+    assert rows == [[csv_value(row[column]) for column in header] for row in listing(client, params)]
+
+
+def test_empty_csv_export_is_the_header_only(client):
+    response = client.get("/universities/export", params={"format": "csv", "states": "ZZ"})
+    assert response.status_code == 200
+    assert list(csv.reader(io.StringIO(response.text))) == [[column.key for column in api.UNIVERSITY_COLUMNS]]
+
+
+def test_empty_ndjson_export_is_empty(client):
+    assert client.get("/universities/export", params={"states": "ZZ"}).content == b""
+
+
+def test_unknown_export_format_is_rejected(client):
+    response = client.get("/universities/export", params={"format": "xlsx"})
+    assert response.status_code == 400
+
+
+def test_parquet_export_without_pyarrow(client, monkeypatch):
+    # A None entry makes the import fail as if pyarrow were not installed
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    response = client.get("/universities/export", params={"format": "parquet"})
+    assert response.status_code == 501
+    assert response.json() == {"detail": "Parquet export requires pyarrow"}
+
+
+def test_parquet_export_matches_the_listing(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    params = {"states": "NY", "offers_bachelors": "true"}
+    response = client.get("/universities/export", params={**params, "format": "parquet"})
+    assert response.status_code == 200
+    assert pq.read_table(io.BytesIO(response.content)).to_pylist() == listing(client, params)
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.mark.parametrize("limit", [0, -1, 201])
+def test_near_rejects_out_of_range_limit(client, limit):
+    response = client.get("/universities/near", params={"lat": 33, "lon": -97, "limit": limit})
+    assert response.status_code == 422
+
+
+def test_near_returns_the_nearest_first(client):
+    rows = client.get("/universities/near", params={"lat": 33, "lon": -97, "limit": 3}).json()
+    # Seeded at (30 + i/10, -100 + i/10), so the nearest to (33, -97) is university 30
+    assert rows[0]["id"] == 30 and rows[0]["distance_km"] == 0
+    assert {row["id"] for row in rows} == {29, 30, 31}
+    distances = [row["distance_km"] for row in rows]
+    assert distances == sorted(distances)
@@ -0,0 +1,43 @@
+"""
+pgbouncer mode sets search_path per transaction, so it must reach every way the
+app talks to the database, not only sessions. Needs Postgres with the group44
+schema: set TEST_POSTGRES_URL (without a search_path option) to run it.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+SCENARIO = """
+import asyncio
+from sqlalchemy import text
+import api
+
+paths = []
+with api.engine.begin() as connection:
+    paths.append(connection.execute(text("SHOW search_path")).scalar())
+with api.engine.connect() as connection:
+    paths.append(connection.execute(text("SHOW search_path")).scalar())
+with api.SessionLocal() as db:
+    paths.append(db.execute(text("SHOW search_path")).scalar())
+
+async def read():
+    async with api.get_async_sessionmaker()() as db:
+        paths.append((await db.execute(text("SHOW search_path"))).scalar())
+    await api.async_engine.dispose()
+asyncio.run(read())
+print(",".join(paths))
+"""
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_pgbouncer_mode_sets_search_path_on_every_connection():
+    env = dict(os.environ, DATABASE_URL=POSTGRES_URL, DB_PGBOUNCER="1", SWIPE_WRITE_BEHIND="0")
+    result = subprocess.run([sys.executable, "-c", SCENARIO], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ",".join(["group44"] * 4)
@@ -0,0 +1,70 @@
+"""
+Pool saturation: with a one-connection pool, requests queue for the connection
+(counted in db_pool_waits_total) and, past DB_POOL_TIMEOUT, fail (db_pool_timeouts_total).
+The pool is sized at import, so this runs the app in its own interpreter.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+SCENARIO = """
+import json, os, re, sys, threading, time
+import api
+from fastapi.testclient import TestClient
+
+api.create_schema()
+client = TestClient(api.app, raise_server_exceptions=False)
+
+def held_request(hold_seconds):
+    # Keeps the only connection checked out while a request needs one
+    statuses = []
+    connection = api.engine.connect()
+    connection.exec_driver_sql("SELECT 1")
+    requests = [threading.Thread(target=lambda: statuses.append(client.get("/stats/swipes").status_code)) for _ in range(4)]
+    for request in requests:
+        request.start()
+    time.sleep(hold_seconds)
+    connection.close()
+    for request in requests:
+        request.join()
+    return sorted(statuses)
+
+waited = held_request(0.2)
+timed_out = held_request(1.0)
+metrics = {}
+for line in client.get("/metrics").text.splitlines():
+    match = re.match(r'(db_pool_\\w+)\\{pool="sync"\\} (\\S+)', line)
+    if match:
+        metrics[match.group(1)] = float(match.group(2))
+print(json.dumps({"waited": waited, "timed_out": timed_out, "metrics": metrics}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def test_pool_waits_and_timeouts_are_reported(tmp_path):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'pool.db'}",
+        DB_POOL_SIZE="1",
+        DB_MAX_OVERFLOW="0",
+        DB_POOL_TIMEOUT="0.5",
+        SWIPE_WRITE_BEHIND="0",
+    )
+    completed = subprocess.run([sys.executable, "-c", SCENARIO], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # Released within the timeout: every request waited, then succeeded
+    assert result["waited"] == [200] * 4
+    # Held past the timeout: every request failed
+    assert result["timed_out"] == [500] * 4
+    metrics = result["metrics"]
+    assert metrics["db_pool_size"] == 1
+    assert metrics["db_pool_waits_total"] >= 8
+    assert metrics["db_pool_timeouts_total"] == 4
+    assert metrics["db_pool_wait_seconds_total"] > 0.5
+    assert metrics["db_pool_checked_out"] == 0
@@ -0,0 +1,48 @@
+import pytest
+
+import api
+import prefetch_images
+from bench.wiki_stub import WikiStub
+
+
+@pytest.fixture
+def wiki(client, monkeypatch):
+    with WikiStub(latency=0) as stub:
+        monkeypatch.setattr(api, "WIKIPEDIA_API_URL", stub.url)
+        monkeypatch.setattr(api, "COMMONS_API_URL", stub.url)
+        # main() installs its own limiter; the test puts the API's back afterwards
+        monkeypatch.setattr(api, "wiki_rate_limiter", None)
+        yield stub
+
+
+def stored_images(ids):
+    with api.SessionLocal() as db:
+        return db.query(api.UniversityImage).filter(api.UniversityImage.university_id.in_(ids)).all()
+
+
+def test_prefetch_stores_images_from_wikipedia(wiki):
+    progress = prefetch_images.main(["--limit", "5", "--force", "--rate", "1000"])
+    assert progress.counts == {"found": 5, "empty": 0, "errors": 0}
+    images = stored_images(range(1, 6))
+    assert len(images) == 5
+    assert all(image.image_url.startswith("https://upload.example.org/") for image in images)
+
+
+def test_prefetch_records_store_errors(wiki, monkeypatch):
+    def failing_store(db, university_id, result):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(api, "store_university_image", failing_store)
+    progress = prefetch_images.main(["--limit", "3", "--force", "--rate", "0"])
+    assert progress.counts == {"found": 0, "empty": 0, "errors": 3}
+
+
+def test_prefetch_without_rate_limit(wiki):
+    progress = prefetch_images.main(["--limit", "2", "--force", "--rate", "0"])
+    assert api.wiki_rate_limiter is None
+    assert progress.counts["found"] == 2
+
+
+def test_rate_limiter_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        api.RateLimiter(0)
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from sqlalchemy import func, select
+
+import api
+
+
+def stored_swipes(direction):
+    with api.SessionLocal() as db:
+        return db.execute(select(func.count()).where(api.UserSwipe.swipe_direction == direction)).scalar()
+
+
+def test_swipes_during_a_build_reach_the_new_model(client, monkeypatch):
+    build = api.RecommendationModel.from_catalog
+
+    def build_while_swiping(catalog):
+        # Arrives after user_swipes was read for the replay, before the model is stored
+        client.post("/swipes/", json={"university_id": 42, "swipe_direction": "right"})
+        return build(catalog)
+
+    monkeypatch.setattr(api.RecommendationModel, "from_catalog", build_while_swiping)
+    ids = [row["id"] for row in client.get("/recommendations", params={"limit": 100}).json()]
+    assert 42 not in ids
+
+    model = api.catalog_cache.peek(("recommender",))
+    # Counted once: not in the replay and the journal both
+    assert model.right_count == stored_swipes("right")
+    assert model.left_count == stored_swipes("left")
+
+
+def test_batch_swipes_during_a_build_reach_the_new_model(client, monkeypatch):
+    insert = api.insert_swipes
+    stamped = threading.Event()
+
+    def slow_insert(db, swipes):
+        # Stamped before the build starts, stored only after its replay would have read user_swipes
+        if swipes[0]["university_id"] == 44:
+            stamped.set()
+            time.sleep(0.3)
+        insert(db, swipes)
+
+    monkeypatch.setattr(api, "insert_swipes", slow_insert)
+    batch = threading.Thread(target=lambda: client.post("/swipes/batch", json=[
+        {"university_id": 44, "swipe_direction": "right"}, {"university_id": 45, "swipe_direction": "left"},
+    ]))
+    batch.start()
+    stamped.wait(5)
+    ids = [row["id"] for row in client.get("/recommendations", params={"limit": 100}).json()]
+    batch.join()
+    assert 44 not in ids and 45 not in ids
+
+    model = api.catalog_cache.peek(("recommender",))
+    assert model.right_count == stored_swipes("right")
+    assert model.left_count == stored_swipes("left")
+
+
+def test_swipes_after_a_build_update_the_cached_model(client):
+    client.get("/recommendations")
+    model = api.catalog_cache.peek(("recommender",))
+    before = model.left_count
+    client.post("/swipes/", json={"university_id": 43, "swipe_direction": "left"})
+    assert model.left_count == before + 1
+    assert 43 not in [row["id"] for row in client.get("/recommendations", params={"limit": 100}).json()]
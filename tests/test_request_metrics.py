@@ -0,0 +1,31 @@
+import logging
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+import api
+
+
+def test_middleware_is_plain_asgi():
+    assert not any(issubclass(middleware.cls, BaseHTTPMiddleware) for middleware in api.app.user_middleware)
+
+
+def test_requests_are_counted_by_route_template(client):
+    client.get("/universities/3")
+    client.get("/universities/4")
+    metrics = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/universities/{university_id}",status="200"}' in metrics
+    assert 'http_request_db_statements_count{route="/universities/{university_id}"}' in metrics
+
+
+def test_slow_requests_are_logged_with_their_statements(client, monkeypatch, caplog):
+    monkeypatch.setattr(api, "SLOW_REQUEST_MS", 0.001)
+    with caplog.at_level(logging.WARNING, logger="api"):
+        client.get("/universities/", params={"states": "TX", "limit": 3})
+    [record] = [record for record in caplog.records if record.getMessage().startswith("Slow request: GET /universities/ -> 200")]
+    assert "SELECT" in record.getMessage()
+
+
+def test_non_cached_routes_are_not_buffered_for_an_etag(client):
+    response = client.get("/universities/export", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.mark.parametrize("limit", [0, -1, 201])
+def test_search_rejects_out_of_range_limit(client, limit):
+    assert client.get("/universities/search/University", params={"limit": limit}).status_code == 422
+
+
+def test_search_returns_at_most_limit(client):
+    response = client.get("/universities/search/University", params={"limit": 3})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_search_ranks_name_prefix_first(client):
+    names = [row["name"] for row in client.get("/universities/search/University 12").json()]
+    assert names[0] == "University 12 of CO"
@@ -0,0 +1,56 @@
+"""
+Startup budget: importing the app stays light and the first request is served quickly.
+Each check runs in a fresh interpreter, since this process has imported everything already.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Generous for a cold interpreter; set lower (or higher on a slow machine) through the environment
+IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET", "2.0"))
+FIRST_RESPONSE_BUDGET_SECONDS = float(os.getenv("STARTUP_FIRST_RESPONSE_BUDGET", "3.0"))
+HEAVY_MODULES = ["pandas", "plotly", "requests"]
+
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+import api
+imported = time.perf_counter() - started
+loaded = [name for name in %r if name in sys.modules]
+database_touched = os.path.exists(%r)
+from fastapi.testclient import TestClient
+status = TestClient(api.app).get("/").status_code
+first_response = time.perf_counter() - started
+print(json.dumps({"imported": imported, "first_response": first_response, "loaded": loaded,
+                  "database_touched": database_touched, "status": status}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def probe(tmp_path):
+    database = str(tmp_path / "startup.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE % (HEAVY_MODULES, database)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_light(tmp_path):
+    result = probe(tmp_path)
+    assert result["loaded"] == []
+    # Importing opens no connection; the schema is created by `python api.py migrate`
+    assert not result["database_touched"]
+    assert result["imported"] < IMPORT_BUDGET_SECONDS
+
+
+def test_first_response_within_budget(tmp_path):
+    result = probe(tmp_path)
+    assert result["status"] == 200
+    assert result["first_response"] < FIRST_RESPONSE_BUDGET_SECONDS
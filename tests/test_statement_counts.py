@@ -0,0 +1,30 @@
+import pytest
+
+
+def selects(statements):
+    return [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"offers_masters": "true"},
+    {"offers_masters": "true", "offers_doctorate": "true"},
+    {"states": "CO,CA", "offers_bachelors": "true", "is_hbcu": "false"},
+])
+def test_listing_runs_one_select(client, statements, params):
+    response = client.get("/universities/", params=params)
+    assert response.status_code == 200
+    assert response.json()
+    assert len(selects(statements)) == 1
+
+
+def test_listing_degree_filter_matches_rows(client):
+    rows = client.get("/universities/", params={"offers_doctorate": "true"}).json()
+    assert [row["id"] for row in rows] == list(range(5, 61, 5))
+
+
+def test_cached_listing_runs_no_select(client, statements):
+    client.get("/universities/", params={"offers_masters": "true"})
+    statements.clear()
+    client.get("/universities/", params={"offers_masters": "true"})
+    assert selects(statements) == []
@@ -0,0 +1,65 @@
+import pytest
+
+import api
+
+
+@pytest.fixture
+def extra_university(client):
+    # One more university, in a state of its own, removed again afterwards
+    def add():
+        with api.SessionLocal() as db:
+            db.add(api.University(id=500, name="University 500 of WY", state="WY", sector="Public"))
+            db.add(api.DegreeOffering(id=500, university_id=500, offers_bachelors=True, highest_degree="Bachelor's"))
+            db.commit()
+
+    yield add
+    with api.SessionLocal() as db:
+        db.query(api.DegreeOffering).filter(api.DegreeOffering.id == 500).delete()
+        db.query(api.University).filter(api.University.id == 500).delete()
+        db.commit()
+    api.catalog_cache.invalidate()
+
+
+def test_data_etag_gets_empty_304(client):
+    first = client.get("/sunburst-chart/data")
+    assert first.status_code == 200
+    assert {"state": "CO", "sector": "Private", "highest_degree": "Doctor's", "count": 3} in first.json()
+    second = client.get("/sunburst-chart/data", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_chart_shares_the_data_etag(client):
+    etag = client.get("/sunburst-chart/data").headers["ETag"]
+    # Answered from the aggregate alone, without rendering the chart
+    response = client.get("/sunburst-chart", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_chart_renders_and_revalidates(client):
+    pytest.importorskip("plotly")
+    first = client.get("/sunburst-chart")
+    assert first.status_code == 200
+    assert "plotly" in first.text
+    second = client.get("/sunburst-chart", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+
+
+def test_etag_changes_after_invalidation_once_the_data_changes(client, extra_university):
+    before = client.get("/sunburst-chart/data").headers["ETag"]
+    # Invalidating unchanged data keeps the tag, so clients keep their copies
+    client.post("/admin/cache/invalidate")
+    assert client.get("/sunburst-chart/data").headers["ETag"] == before
+
+    extra_university()
+    # Served from the cache until it is invalidated
+    assert client.get("/sunburst-chart/data", headers={"If-None-Match": before}).status_code == 304
+    client.post("/admin/cache/invalidate")
+    for path in ("/sunburst-chart/data", "/sunburst-chart"):
+        response = client.get(path, headers={"If-None-Match": before})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != before
+    assert {"state": "WY", "sector": "Public", "highest_degree": "Bachelor's", "count": 1} in client.get("/sunburst-chart/data").json()
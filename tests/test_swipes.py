@@ -0,0 +1,149 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+import api
+
+
+def count_swipes(university_id):
+    with api.SessionLocal() as db:
+        return db.execute(select(func.count()).where(api.UserSwipe.university_id == university_id)).scalar()
+
+
+def swipe(university_id, direction="right"):
+    return {"university_id": university_id, "swipe_direction": direction, "notes": None, "swipe_timestamp": api.datetime.utcnow()}
+
+
+@pytest.mark.parametrize("body", [
+    {"university_id": 1, "swipe_direction": "up"},
+    {"university_id": 1, "swipe_direction": "right-right-right"},
+    {"university_id": 0, "swipe_direction": "left"},
+    {"university_id": 2**63, "swipe_direction": "left"},
+    {"university_id": "one", "swipe_direction": "left"},
+])
+def test_invalid_swipe_is_rejected(client, body):
+    assert client.post("/swipes/", json=body).status_code == 422
+
+
+def test_swipe_for_unknown_university_is_rejected(client):
+    assert client.post("/swipes/", json={"university_id": 9999, "swipe_direction": "right"}).status_code == 404
+    assert count_swipes(9999) == 0
+
+
+def test_batch_with_unknown_university_stores_nothing(client):
+    before = count_swipes(10)
+    response = client.post("/swipes/batch", json=[
+        {"university_id": 10, "swipe_direction": "right"},
+        {"university_id": 9998, "swipe_direction": "left"},
+    ])
+    assert response.status_code == 404
+    assert "9998" in response.json()["detail"]
+    assert count_swipes(10) == before
+
+
+@pytest.fixture
+def buffer(client):
+    # A running buffer that only flushes when told to
+    buffer = api.SwipeBuffer(flush_interval=3600, max_size=100)
+    buffer.start()
+    yield buffer
+    buffer.stop()
+
+
+def test_flush_drops_rejected_rows_and_keeps_the_rest(buffer):
+    before = count_swipes(11)
+    dropped = sum(api.SWIPES_DROPPED.series.values())
+    buffer.add(swipe(11))
+    buffer.add(swipe(2**63))  # overflows the column
+    buffer.add(swipe(11, "left"))
+
+    assert buffer.flush() == 3
+    assert count_swipes(11) == before + 2
+    assert sum(api.SWIPES_DROPPED.series.values()) == dropped + 1
+    # Nothing is left behind to fail the next flush
+    assert buffer.flush() == 0
+
+
+def test_flush_keeps_swipes_when_the_database_is_unavailable(buffer, monkeypatch):
+    buffer.add(swipe(12))
+
+    def unavailable(self, swipes):
+        raise OperationalError("INSERT", {}, Exception("database is down"))
+
+    with monkeypatch.context() as patch:
+        patch.setattr(api.SwipeBuffer, "_write", unavailable)
+        with pytest.raises(OperationalError):
+            buffer.flush()
+        assert buffer.try_flush() == 0
+    before = count_swipes(12)
+    assert buffer.flush() == 1
+    assert count_swipes(12) == before + 1
+
+
+@pytest.mark.parametrize("path", [
+    "/matches",
+    "/stats/swipes",
+    "/stats/swipes/universities",
+    "/stats/swipes/universities/1",
+    "/stats/swipes/states",
+    "/stats/swipes/sectors",
+    "/stats/swipes/check",
+])
+def test_reads_survive_a_failing_flush(client, monkeypatch, path):
+    def failing_flush():
+        raise OperationalError("INSERT", {}, Exception("database is down"))
+
+    monkeypatch.setattr(api.swipe_buffer, "flush", failing_flush)
+    assert client.get(path).status_code == 200
+
+
+def stored_stats():
+    with api.SessionLocal() as db:
+        return {
+            stats.university_id: {column: getattr(stats, column) for column in api.SWIPE_COUNT_COLUMNS}
+            for stats in db.execute(select(api.UniversitySwipeStats)).scalars()
+            if any(getattr(stats, column) for column in api.SWIPE_COUNT_COLUMNS)
+        }
+
+
+def recomputed_stats():
+    with api.SessionLocal() as db:
+        return {key: dict(counts) for key, counts in api.recompute_swipe_stats(db).items() if any(counts.values())}
+
+
+def test_counters_match_a_recompute_after_every_kind_of_write(client, buffer):
+    before = client.get("/stats/swipes/universities/20").json()
+
+    client.post("/swipes/", json={"university_id": 20, "swipe_direction": "right"})
+    client.post("/swipes/", json={"university_id": 21, "swipe_direction": "left"})
+    client.post("/swipes/batch", json=[
+        {"university_id": 20, "swipe_direction": "right"},
+        {"university_id": 22, "swipe_direction": "left"},
+        {"university_id": 22, "swipe_direction": "right"},
+    ])
+    buffer.add(swipe(20, "left"))
+    buffer.add(swipe(23))
+    assert buffer.flush() == 2
+    match_id = max(match["id"] for match in client.get("/matches").json() if match["university_id"] == 20)
+    assert client.delete(f"/matches/{match_id}").status_code == 200
+
+    assert stored_stats() == recomputed_stats()
+    check = client.get("/stats/swipes/check").json()
+    assert check["consistent"], check
+    after = client.get("/stats/swipes/universities/20").json()
+    assert after["right_swipes"] == before["right_swipes"] + 2
+    assert after["left_swipes"] == before["left_swipes"] + 1
+    assert after["matches"] == before["matches"] + 1
+
+    totals = client.get("/stats/swipes").json()
+    recomputed = recomputed_stats().values()
+    for column in api.SWIPE_COUNT_COLUMNS:
+        expected = sum(counts[column] for counts in recomputed)
+        assert totals[column] == expected
+        assert sum(row[column] for row in client.get("/stats/swipes/states").json()) == expected
+        assert sum(row[column] for row in client.get("/stats/swipes/sectors").json()) == expected
+
+
+@pytest.mark.parametrize("limit", [0, -1, 201])
+def test_top_swiped_rejects_out_of_range_limit(client, limit):
+    assert client.get("/stats/swipes/universities", params={"limit": limit}).status_code == 422